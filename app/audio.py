@@ -0,0 +1,236 @@
+"""
+Decode uploaded audio straight to the array Whisper consumes.
+
+Starlette receives the whole multipart body into a ``SpooledTemporaryFile``
+(on disk above 1 MB) before the handler runs. ``decode_upload`` then reads
+that file in ``UPLOAD_CHUNK_SIZE`` chunks and pipes them into ffmpeg's
+stdin while its stdout (16 kHz mono signed 16-bit PCM, the same conversion
+``whisper.load_audio`` does) is read concurrently, so decoding writes no
+file of its own and never holds the compressed upload in memory as a whole.
+
+Because the body is spooled first, the upload size is bounded earlier by
+``UploadSizeLimit``, an ASGI middleware that answers 413 from the
+``Content-Length`` header before any of the body is read (and counts the
+bytes of chunked bodies as they arrive). ``decode_upload`` still enforces
+``settings.max_audio_upload_bytes`` per file, and cuts audio longer than
+``settings.max_audio_seconds`` off early with ``AudioTooLarge``.
+
+Formats whose index sits at the end of the file (some MP4/M4A) cannot be
+decoded from a pipe; browser recordings (WebM/Opus, Ogg, WAV, MP3) can.
+
+``PcmStream`` / ``FfmpegStream`` do the same for audio arriving frame by
+frame over a WebSocket (see ``app.streaming``).
+"""
+import asyncio
+import logging
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PCM_READ_SIZE = 64 * 1024
+MAX_STDERR_BYTES = 4096
+
+FFMPEG_COMMAND = [
+    "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+    "-i", "pipe:0",
+    "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+    "pipe:1",
+]
+
+
+class AudioTooLarge(Exception):
+    pass
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware rejecting request bodies above a per-path byte limit
+    before Starlette spools them. ``limits`` maps a path to a callable
+    returning its limit, so settings are read per request.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.limits:
+            return await self.app(scope, receive, send)
+
+        limit = self.limits[scope["path"]]()
+        detail = f"Request body is larger than {limit} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            return await response(scope, receive, send)
+
+        # no (or a lying) Content-Length: stop once the body outgrows the limit
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def pcm_to_float32(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+async def decode_upload(upload, max_bytes: int = None, max_seconds: float = None) -> np.ndarray:
+    """Stream an ``UploadFile`` through ffmpeg into a float32 array at 16 kHz."""
+    max_bytes = max_bytes or settings.max_audio_upload_bytes
+    max_pcm_bytes = int((max_seconds or settings.max_audio_seconds) * SAMPLE_RATE * 2)
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *FFMPEG_COMMAND,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is not installed")
+
+    async def feed():
+        received = 0
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > max_bytes:
+                    process.kill()
+                    raise AudioTooLarge(f"Audio upload is larger than {max_bytes} bytes")
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg gave up early, its stderr says why
+        finally:
+            if not process.stdin.is_closing():
+                process.stdin.close()
+
+    async def read_pcm():
+        pcm = bytearray()
+        while True:
+            chunk = await process.stdout.read(PCM_READ_SIZE)
+            if not chunk:
+                return pcm
+            pcm += chunk
+            if len(pcm) > max_pcm_bytes:
+                process.kill()
+                raise AudioTooLarge(f"Audio is longer than {max_pcm_bytes // (SAMPLE_RATE * 2)} seconds")
+
+    try:
+        _, pcm, errors = await asyncio.gather(feed(), read_pcm(), process.stderr.read())
+        returncode = await process.wait()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if returncode != 0 or not pcm:
+        message = errors[-MAX_STDERR_BYTES:].decode("utf-8", "replace").strip()
+        raise AudioDecodeError(f"Could not decode audio: {message or 'no audio stream'}")
+    return pcm_to_float32(pcm)
+
+
+class PcmStream:
+    """Incoming frames that already are 16 kHz mono s16le PCM (e.g. from an AudioWorklet)."""
+
+    def __init__(self):
+        self._pcm = bytearray()
+
+    async def start(self):
+        pass
+
+    async def write(self, chunk: bytes):
+        self._pcm += chunk
+
+    def read_available(self) -> np.ndarray:
+        # hand out whole samples only, keep an odd trailing byte for the next frame
+        usable = len(self._pcm) - len(self._pcm) % 2
+        samples = pcm_to_float32(bytes(self._pcm[:usable]))
+        del self._pcm[:usable]
+        return samples
+
+    async def close(self) -> np.ndarray:
+        return self.read_available()
+
+    def kill(self):
+        pass
+
+
+class FfmpegStream(PcmStream):
+    """
+    Encoded frames (MediaRecorder WebM/Opus, Ogg, ...) decoded by one
+    long-running ffmpeg; PCM becomes available as ffmpeg produces it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.process = None
+        self._reader = None
+
+    async def start(self):
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *FFMPEG_COMMAND,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            raise AudioDecodeError("ffmpeg is not installed")
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        while True:
+            chunk = await self.process.stdout.read(PCM_READ_SIZE)
+            if not chunk:
+                return
+            self._pcm += chunk
+
+    async def write(self, chunk: bytes):
+        try:
+            self.process.stdin.write(chunk)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise AudioDecodeError("Could not decode audio stream")
+
+    async def close(self) -> np.ndarray:
+        """Flush ffmpeg and return whatever PCM is left."""
+        if self.process is None:
+            return self.read_available()
+        if not self.process.stdin.is_closing():
+            self.process.stdin.close()
+        await self._reader
+        await self.process.wait()
+        return self.read_available()
+
+    def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+        if self._reader is not None:
+            self._reader.cancel()
+
+
+STREAM_FORMATS = {"pcm": PcmStream, "encoded": FfmpegStream}
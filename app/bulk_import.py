@@ -0,0 +1,207 @@
+"""
+Bulk candidate import from partner exports.
+
+Reads a JSONL or CSV file of ``UserModel`` records as a stream and inserts
+users in batches, so memory stays flat however large the file is. Each
+batch costs one email lookup, one skill and one language upsert and one
+commit. Bios are not embedded here: every imported user with a bio gets an
+``EmbeddingJob`` in the same transaction, and the embedding workers
+(``app.embedding_queue``) embed and upsert them with retries.
+
+CSV files use one column per ``UserModel`` field: ``skills`` and
+``languages`` are ``;``-separated, ``experiences``, ``projects`` and
+``certifications`` hold JSON arrays.
+
+Usage:
+    python -m app.bulk_import candidates.jsonl
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.models import User
+from app.schemas import UserModel
+from app.profiles import build_user, resolve_skills, resolve_languages
+from app.embedding_queue import enqueue_embedding
+from app.lexical_index import profile_index
+from app.skill_bitmap import skill_index
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 500     # users per DB transaction
+MAX_REPORTED_ERRORS = 1000  # keep the report bounded, the rest is only counted
+
+CSV_LIST_FIELDS = ("skills", "languages")
+CSV_JSON_FIELDS = ("experiences", "projects", "certifications")
+
+
+def read_jsonl(stream):
+    """Yield ``(row_number, record)``; record is an Exception for bad lines."""
+    for row_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, e
+
+
+def read_csv(stream):
+    """Yield ``(row_number, record)``; record is an Exception for bad rows."""
+    for row_number, row in enumerate(csv.DictReader(stream), 1):
+        try:
+            record = {key: value for key, value in row.items() if value not in (None, "")}
+            for field in CSV_LIST_FIELDS:
+                record[field] = [item for item in record.get(field, "").split(";") if item.strip()]
+            for field in CSV_JSON_FIELDS:
+                record[field] = json.loads(record.get(field) or "[]")
+            yield row_number, record
+        except json.JSONDecodeError as e:
+            yield row_number, e
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+def detect_format(filename: str) -> str:
+    return "csv" if filename and filename.lower().endswith(".csv") else "jsonl"
+
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.queued_for_embedding = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number: int, message: str, count_failure: bool = True):
+        if count_failure:
+            self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "queued_for_embedding": self.queued_for_embedding,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def import_users(stream, db: Session, fmt: str = "jsonl", on_progress=None) -> dict:
+    """
+    Import every record of ``stream`` (a text file object).
+
+    ``on_progress`` is called with the running report after each batch.
+    Rows that fail validation or duplicate an existing email are reported
+    by row number and do not stop the import.
+    """
+    report = ImportReport()
+    records = READERS[fmt](stream)
+
+    while True:
+        batch = list(islice(records, IMPORT_BATCH_SIZE))
+        if not batch:
+            break
+        _import_batch(batch, db, report)
+        if on_progress:
+            on_progress(report)
+
+    return report.as_dict()
+
+
+def _import_batch(batch, db: Session, report: ImportReport):
+    report.processed += len(batch)
+
+    # Validate
+    candidates = []
+    for row_number, record in batch:
+        if isinstance(record, Exception):
+            report.error(row_number, f"Invalid record: {record}")
+            continue
+        try:
+            candidates.append((row_number, UserModel(**record)))
+        except (ValidationError, TypeError) as e:
+            report.error(row_number, f"Invalid record: {e}")
+
+    # Drop emails that already exist, in the database or earlier in the file
+    emails = [user.email for _, user in candidates]
+    taken = {email for (email,) in db.query(User.email).filter(User.email.in_(emails))}
+    unique = []
+    for row_number, user in candidates:
+        if user.email in taken:
+            report.error(row_number, "Email already registered")
+            continue
+        taken.add(user.email)
+        unique.append((row_number, user))
+    if not unique:
+        return
+
+    # Insert the whole batch in one transaction
+    try:
+        skills = resolve_skills(db, [name for _, user in unique for name in user.skills])
+        languages = resolve_languages(db, [name for _, user in unique for name in user.languages])
+        skills_by_name = {skill.skill_name: skill for skill in skills}
+        languages_by_name = {language.language_name: language for language in languages}
+
+        new_users = [(row_number, build_user(user, skills_by_name, languages_by_name)) for row_number, user in unique]
+        db.add_all([new_user for _, new_user in new_users])
+        # committed together with the users, so no imported bio is left unembedded
+        queued = [enqueue_embedding(db, new_user) for _, new_user in new_users]
+        db.flush()
+
+        # read ids before commit expires the objects
+        new_ids = [new_user.id for _, new_user in new_users]
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for row_number, _ in unique:
+            report.error(row_number, f"Database error: {e}")
+        return
+    finally:
+        db.expunge_all()  # the batch is done with, keep the session small
+    report.imported += len(new_users)
+    report.queued_for_embedding += sum(job is not None for job in queued)
+
+    # this process' search indexes; other workers pick the batch up on their next sync
+    profile_index.refresh_users(new_ids)
+    skill_index.refresh_users(new_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import candidates from a JSONL or CSV export.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(READERS), default=None)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    def log_progress(report):
+        logger.info(f"{report.processed} rows processed, {report.imported} imported, {report.failed} failed")
+
+    db = SessionLocal()
+    try:
+        with io.open(args.path, newline="", encoding="utf-8") as stream:
+            report = import_users(
+                stream, db,
+                fmt=args.format or detect_format(args.path),
+                on_progress=log_progress,
+            )
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
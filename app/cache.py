@@ -0,0 +1,123 @@
+"""
+Small cache building blocks shared by the embedding and transcription caches.
+
+``LRUCache`` is an in-process, thread-safe LRU keyed by string.
+``DiskCache`` is a persistent byte store in a SQLite file with
+least-recently-used eviction once the stored values exceed ``max_bytes``.
+SQLite handles locking, so several app workers can share one file. The
+total stored size is kept in a one-row ``totals`` table by triggers, so a
+write checks the limit without summing every entry.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            # one transaction, so a worker starting alongside cannot write between the sum and the triggers
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS totals ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " bytes INTEGER NOT NULL)"
+            )
+            # caches created before the totals table start from their current size
+            self._conn.execute(
+                "INSERT OR IGNORE INTO totals (id, bytes) SELECT 1, COALESCE(SUM(size), 0) FROM entries"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN"
+                " UPDATE totals SET bytes = bytes + NEW.size WHERE id = 1; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN"
+                " UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN"
+                " UPDATE totals SET bytes = bytes - OLD.size WHERE id = 1; END"
+            )
+
+    def get(self, key: str):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def set(self, key: str, value: bytes):
+        with self._lock, self._conn:
+            # an upsert, not INSERT OR REPLACE: the implicit delete of a replace skips the triggers
+            self._conn.execute(
+                "INSERT INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET"
+                " value = excluded.value, size = excluded.size, last_access = excluded.last_access",
+                (key, value, len(value), time.time()),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT bytes FROM totals WHERE id = 1").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop least recently used entries until we are back under the limit
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM entries), bytes FROM totals WHERE id = 1"
+            ).fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
@@ -14,6 +14,33 @@ class Settings(BaseSettings):
     gemini_api_key: str
     base_url: str
     pinecone_api_key:str
+    scoring_model_path: str = "data/scoring_model.pkl"
+    embedding_cache_path: str = "data/embedding_cache.sqlite3"
+    embedding_cache_max_bytes: int = 256 * 1024 * 1024
+    embedding_cache_memory_items: int = 10000
+    vector_backend: str = "pinecone"  # pinecone, numpy or ivf
+    vector_store_path: str = "data/candidate-search"
+    vector_dimension: int = 768
+    warm_up_services: str = ""  # comma separated: transcription,embeddings,vector_store,llm
+    transcription_workers: int = 1
+    transcription_queue_size: int = 4   # jobs waiting beyond the busy workers
+    transcription_timeout: float = 120  # seconds per request
+    max_audio_upload_bytes: int = 25 * 1024 * 1024
+    max_audio_batch_upload_bytes: int = 100 * 1024 * 1024  # whole /transcribe-batch request
+    max_audio_seconds: float = 900
+    transcription_cache_path: str = "data/transcription_cache.sqlite3"
+    transcription_cache_max_bytes: int = 64 * 1024 * 1024
+    vad_enabled: bool = True  # trim silence before Whisper on uploaded answers
+    whisper_model: str = "medium"      # tiny, base, small, medium, large, ... (.en variants too)
+    whisper_fallback_model: str = ""   # smaller model used when the latency budget would be missed
+    whisper_latency_budget: float = 0  # seconds per transcription, 0 disables the fallback
+    whisper_device: str = ""           # cuda / cpu, empty picks automatically
+    whisper_threads: int = 0           # torch threads per pool worker, 0 keeps torch's default
+    whisper_fp16: bool = True          # half precision, GPU only
+    whisper_int8: bool = False         # dynamic int8 quantization of linear layers, CPU only
+    llm_timeout: float = 60            # seconds per mock-interview LLM call
+    llm_max_concurrency: int = 8       # LLM calls in flight per worker
+    llm_max_retries: int = 2
 
     class Config:
         env_file = ".env" # this is to load the variable for the .env file
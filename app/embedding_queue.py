@@ -0,0 +1,243 @@
+"""
+Durable, table-backed queue for bio embeddings.
+
+Registration only inserts an ``EmbeddingJob`` row in its own transaction.
+A background worker thread claims pending rows with
+``FOR UPDATE SKIP LOCKED`` (so several app workers can share the queue),
+embeds all their bios with one ``embed_documents`` call, upserts all
+vectors with one ``index.upsert`` call and marks the rows done. Failed
+batches are retried with exponential backoff.
+
+Each vector carries the user's ``skill_ids`` and ``language_ids`` as
+metadata, so skill filters can run inside Pinecone. Vectors written before
+that are refreshed with ``python -m app.embedding_queue --requeue-all``.
+"""
+import argparse
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, literal
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import EmbeddingJob, User, user_skills, user_languages
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100           # bios per embed_documents / upsert call
+POLL_INTERVAL = 1.0        # seconds between polls when the queue is idle
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 5       # seconds, doubled after every failed attempt
+
+
+def enqueue_embedding(db: Session, user: User):
+    """
+    Queue the user's bio for embedding.
+
+    Nothing is committed here; the job becomes visible together with the
+    caller's transaction. Users without a bio have nothing to embed.
+    """
+    if not user.bio:
+        return None
+    job = EmbeddingJob(user=user)
+    db.add(job)
+    return job
+
+
+def enqueue_all_embeddings(db: Session) -> int:
+    """Queue every user with a bio, e.g. to rewrite vector metadata. Returns the number queued."""
+    # callable column defaults are not applied to INSERT ... SELECT
+    now = datetime.utcnow()
+    users = db.query(
+        User.id, literal("pending"), literal(0), literal(now), literal(now), literal(now)
+    ).filter(User.bio.isnot(None), User.bio != "")
+    queued = db.execute(
+        EmbeddingJob.__table__.insert().from_select(
+            ["user_id", "status", "attempts", "created_at", "updated_at", "next_attempt_at"], users
+        )
+    ).rowcount
+    db.commit()
+    return queued
+
+
+def vector_metadata(db: Session, users) -> dict:
+    """User id -> the metadata stored with the user's vector."""
+    user_ids = [user.id for user in users]
+    metadata = {
+        user.id: {"email": user.email, "name": user.name, "skill_ids": [], "language_ids": []}
+        for user in users
+    }
+    # Pinecone metadata lists hold strings
+    for user_id, skill_id in db.query(user_skills.c.user_id, user_skills.c.skill_id).filter(
+        user_skills.c.user_id.in_(user_ids)
+    ):
+        metadata[user_id]["skill_ids"].append(str(skill_id))
+    for user_id, language_id in db.query(user_languages.c.user_id, user_languages.c.language_id).filter(
+        user_languages.c.user_id.in_(user_ids)
+    ):
+        metadata[user_id]["language_ids"].append(str(language_id))
+    return metadata
+
+
+def get_embedding_status(db: Session, user_id: int):
+    """Latest embedding job of a user, or None."""
+    job = (
+        db.query(EmbeddingJob)
+        .filter(EmbeddingJob.user_id == user_id)
+        .order_by(EmbeddingJob.id.desc())
+        .first()
+    )
+    if not job:
+        return None
+    return {
+        "status": job.status,
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def get_queue_stats(db: Session) -> dict:
+    counts = dict(db.query(EmbeddingJob.status, func.count()).group_by(EmbeddingJob.status).all())
+    oldest_pending = (
+        db.query(func.min(EmbeddingJob.created_at))
+        .filter(EmbeddingJob.status == "pending")
+        .scalar()
+    )
+    return {
+        "pending": counts.get("pending", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_pending": oldest_pending,
+    }
+
+
+class EmbeddingWorker:
+    """
+    ``get_embeddings`` / ``get_index`` return the shared clients; they are
+    only called once there is work, so an idle worker loads nothing.
+    """
+
+    def __init__(self, get_embeddings, get_index):
+        self.get_embeddings = get_embeddings
+        self.get_index = get_index
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def notify(self):
+        """Process the queue now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                logger.error(f"Embedding worker error: {e}")
+                processed = 0
+            if not processed:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+
+    def process_batch(self) -> int:
+        """Claim, embed and upsert one batch. Returns the number of jobs claimed."""
+        db = SessionLocal()
+        try:
+            jobs = (
+                db.query(EmbeddingJob)
+                .filter(
+                    EmbeddingJob.status == "pending",
+                    EmbeddingJob.next_attempt_at <= datetime.utcnow(),
+                )
+                .order_by(EmbeddingJob.id)
+                .limit(BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not jobs:
+                db.rollback()
+                return 0
+
+            users = {
+                user.id: user
+                for user in db.query(User.id, User.email, User.name, User.bio)
+                .filter(User.id.in_({job.user_id for job in jobs}))
+            }
+            # several pending jobs for one user coalesce into one embedding
+            to_embed = [
+                users[user_id]
+                for user_id in sorted({job.user_id for job in jobs})
+                if user_id in users and users[user_id].bio
+            ]
+
+            try:
+                if to_embed:
+                    metadata = vector_metadata(db, to_embed)
+                    vectors = self.get_embeddings().embed_documents([user.bio for user in to_embed])
+                    self.get_index().upsert([
+                        (str(user.id), vector, metadata[user.id])
+                        for user, vector in zip(to_embed, vectors)
+                    ])
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(jobs)} failed: {e}")
+                for job in jobs:
+                    job.attempts += 1
+                    job.last_error = str(e)
+                    if job.attempts >= MAX_ATTEMPTS:
+                        job.status = "failed"
+                    else:
+                        delay = RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+                        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                db.commit()
+                return len(jobs)
+
+            for job in jobs:
+                job.status = "done"
+                job.attempts += 1
+                job.last_error = None
+            db.commit()
+            logger.info(f"Embedded {len(to_embed)} bios for {len(jobs)} queued jobs")
+            return len(jobs)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the bio embedding queue.")
+    parser.add_argument(
+        "--requeue-all", action="store_true",
+        help="queue every user with a bio again, e.g. after the vector metadata changed",
+    )
+    args = parser.parse_args()
+    if not args.requeue_all:
+        parser.error("nothing to do")
+
+    db = SessionLocal()
+    try:
+        print(f"Queued {enqueue_all_embeddings(db)} users for embedding")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
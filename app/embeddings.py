@@ -0,0 +1,117 @@
+"""
+Shared, cached Gemini embeddings for bios and HR search queries.
+
+Vectors are cached under a key made of the model name, the kind of
+embedding (document or query, they use different task types) and a
+SHA-256 of the normalized text (whitespace collapsed, case folded), so
+trivially different copies of a text share an entry; the API is still sent
+the text as given. Lookups go to an in-process LRU first, then
+to a persistent SQLite tier, and only misses reach the API.
+
+The shared instance is created lazily through ``app.services.get_embeddings``.
+"""
+import hashlib
+import threading
+
+import numpy as np
+
+from app.cache import DiskCache, LRUCache
+from app.config import settings
+
+EMBEDDING_MODEL = "models/embedding-001"
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class CachedEmbeddings:
+    """Drop-in wrapper exposing embed_documents / embed_query with a two-tier cache."""
+
+    def __init__(self, embeddings, model_name: str, memory_cache: LRUCache, disk_cache: DiskCache):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_cache = memory_cache
+        self.disk_cache = disk_cache
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def cache_key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    def _lookup(self, key: str):
+        vector = self.memory_cache.get(key)
+        if vector is not None:
+            self._count("memory_hits")
+            return vector
+
+        raw = self.disk_cache.get(key)
+        if raw is not None:
+            vector = np.frombuffer(raw, dtype=np.float32).tolist()
+            self.memory_cache.set(key, vector)
+            self._count("disk_hits")
+            return vector
+
+        self._count("misses")
+        return None
+
+    def _store(self, key: str, vector):
+        self.memory_cache.set(key, list(vector))
+        self.disk_cache.set(key, np.asarray(vector, dtype=np.float32).tobytes())
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [self.cache_key("document", normalize_text(text)) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+
+        # embed all misses (once per key, first text seen) in a single API call
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            fresh = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            for i, key in enumerate(keys):
+                if vectors[i] is None:
+                    vectors[i] = fresh[key]
+            for key, vector in fresh.items():
+                self._store(key, vector)
+        return vectors
+
+    def embed_query(self, text: str):
+        key = self.cache_key("query", normalize_text(text))
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory_cache),
+            "disk": self.disk_cache.stats(),
+        }
+
+
+def create_embeddings() -> CachedEmbeddings:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=settings.gemini_api_key),
+        EMBEDDING_MODEL,
+        LRUCache(settings.embedding_cache_memory_items),
+        DiskCache(settings.embedding_cache_path, settings.embedding_cache_max_bytes),
+    )
@@ -0,0 +1,69 @@
+"""
+Which rows of a table an in-memory index has already loaded.
+
+The job index, the BM25 profile index and the skill bitmaps are built in
+process memory and then kept current by asking the database for rows they
+have not seen. A plain ``max(id)`` watermark is not enough for that: ids
+are handed out when a row is inserted, not when its transaction commits,
+so a slow transaction (a 500-user bulk import batch, a registration racing
+another one) can commit an id *below* the watermark after it has moved on,
+and that row would never be loaded.
+
+``IdWatermark`` therefore also remembers the gaps it stepped over, the ids
+in the trailing ``GAP_WINDOW`` below the watermark that were not there yet,
+and keeps asking for them for ``GAP_TTL`` seconds. Ids still missing after
+that were rolled back or deleted. ``lock`` serializes syncs, so concurrent
+cold requests build the index once.
+"""
+import threading
+import time
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+GAP_WINDOW = 5000   # ids below the watermark that are re-checked
+GAP_TTL = 600       # seconds a missing id is waited for
+
+
+class IdWatermark:
+    def __init__(self, column):
+        self.column = column
+        self.lock = threading.Lock()
+        self.last_id = 0        # highest id loaded
+        self.gaps = {}          # id below last_id not loaded yet -> time first missed
+        self.loaded = False     # a first full sync has happened
+
+    def pending_ids(self, db: Session) -> list:
+        """Ids now in the table that were not loaded yet, ascending."""
+        self._expire_gaps()
+        condition = self.column > self.last_id
+        if self.gaps:
+            condition = or_(condition, self.column.in_(list(self.gaps)))
+        return sorted(row_id for (row_id,) in db.query(self.column).filter(condition))
+
+    def mark_loaded(self, ids):
+        """Record ``ids`` (a result of ``pending_ids``, or part of it, in order) as loaded."""
+        if not ids:
+            return
+        for row_id in ids:
+            self.gaps.pop(row_id, None)
+        if ids[-1] > self.last_id:
+            now = time.monotonic()
+            seen = set(ids)
+            for row_id in range(max(self.last_id + 1, ids[-1] - GAP_WINDOW), ids[-1]):
+                if row_id not in seen:
+                    self.gaps[row_id] = now
+            self.last_id = ids[-1]
+
+    def reset(self):
+        self.last_id = 0
+        self.gaps = {}
+        self.loaded = False
+
+    def _expire_gaps(self):
+        oldest = time.monotonic() - GAP_TTL
+        floor = self.last_id - GAP_WINDOW
+        self.gaps = {
+            row_id: missed for row_id, missed in self.gaps.items()
+            if missed > oldest and row_id > floor
+        }
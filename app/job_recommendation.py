@@ -1,14 +1,23 @@
-from app.database import get_db
+import logging
+import threading
+
+from app.database import get_db, SessionLocal
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from app.models import User, Job
+from app.profiles import load_user_profile
+from app.index_sync import IdWatermark
+
+logger = logging.getLogger(__name__)
 
 
 def get_user_profile(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = load_user_profile(db, user_id)
     if not user:
         return None
+    return build_user_profile(user)
 
+def build_user_profile(user: User) -> dict:
     profile = {
         "skills": [skill.skill_name for skill in user.skills],
         "languages": [language.language_name for language in user.languages],
@@ -20,45 +29,296 @@ def get_user_profile(user_id: int, db: Session = Depends(get_db)):
     }
     return profile
 
-def get_all_jobs( db: Session = Depends(get_db)):
-    jobs = db.query(Job).all()
-    job_list = [
-        {
-            "id": job.id,
-            "title": job.title,
-            "description": job.description,
-            "company_name": job.company_name,
-            "location": job.location,
-            "job_type": job.job_type,
-            "work_type": job.work_type,
-        }
-        for job in jobs
-    ]
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "title": job.title,
+        "description": job.description,
+        "company_name": job.company_name,
+        "location": job.location,
+        "job_type": job.job_type,
+        "work_type": job.work_type,
+    }
+
+def get_all_jobs(db: Session = Depends(get_db), job_ids=None):
+    query = db.query(Job)
+    if job_ids is not None:
+        query = query.filter(Job.id.in_(job_ids))
+    jobs = query.order_by(Job.id).all()
+    job_list = [job_to_dict(job) for job in jobs]
     return job_list
 
 
+import numpy as np
+from scipy.sparse import vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-def compute_similarity(user_profile, job_list):
+# Refit the vocabulary/IDF once the jobs added since the last fit exceed this
+# fraction of the fitted corpus. Until then new jobs are transformed with the
+# existing vocabulary, which is cheap but ignores terms it has never seen.
+REFIT_RATIO = 0.2
+
+# Job columns that /user/jobs can filter on through the inverted index
+FILTER_FIELDS = ("location", "work_type", "job_type")
+
+
+def get_job_text(job: dict) -> str:
+    return job["description"] + " " + job["title"]
+
+def normalize_filter_value(value) -> str:
+    return " ".join(str(value).lower().split())
+
+
+class JobIndexNotReady(Exception):
+    pass
+
+
+class JobIndex:
+    """
+    Long-lived TF-IDF index over all job postings.
+
+    The vectorizer is fitted once and every job is stored as an L2-normalised
+    sparse row, so scoring a user is one transform of the profile text plus
+    a sparse matrix-vector product. An inverted index from location, work type
+    and job type to row positions narrows the rows before any vector math.
+
+    Fitting reads and vectorizes every job, so it never runs on the request
+    path: the first fit and every refit happen in a background thread while
+    requests keep scoring against the current matrix, which is swapped out
+    under ``_lock`` once the new one is ready.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.vectorizer = None
+        self.matrix = None      # one row per job, same order as self.jobs
+        self.jobs = []
+        self.postings = {field: {} for field in FILTER_FIELDS}
+        self.job_ids = set()    # Job.id of every indexed row
+        self.watermark = IdWatermark(Job.id)
+        self.fitted_size = 0
+        self.added_since_fit = 0
+        # called after a refit replaced the vocabulary, e.g. to rebuild stored scores
+        self.refit_listeners = []
+        self._refit_thread = None
+        self._refit_thread_lock = threading.Lock()
+
+    def fit(self, job_list):
+        """Rebuild the vocabulary and the job matrix from scratch."""
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform([get_job_text(job) for job in job_list])
+        self._swap(vectorizer, matrix, job_list)
+
+    def _swap(self, vectorizer, matrix, job_list):
+        with self._lock:
+            self.vectorizer = vectorizer
+            self.matrix = matrix
+            self.jobs = list(job_list)
+            self.postings = {field: {} for field in FILTER_FIELDS}
+            self._index_postings(self.jobs, start=0)
+            self.job_ids = {job["id"] for job in job_list}
+            self.fitted_size = len(job_list)
+            self.added_since_fit = 0
+
+    def add_jobs(self, job_list):
+        """Append jobs to the index using the already fitted vocabulary."""
+        with self._lock:
+            new_jobs = [job for job in job_list if job["id"] not in self.job_ids]
+            if not new_jobs:
+                return
+            rows = self.vectorizer.transform([get_job_text(job) for job in new_jobs])
+            self.matrix = vstack([self.matrix, rows], format="csr")
+            self._index_postings(new_jobs, start=len(self.jobs))
+            self.jobs.extend(new_jobs)
+            self.job_ids.update(job["id"] for job in new_jobs)
+            self.added_since_fit += len(new_jobs)
+
+    def _index_postings(self, job_list, start: int):
+        for row, job in enumerate(job_list, start):
+            for field in FILTER_FIELDS:
+                value = normalize_filter_value(job[field])
+                self.postings[field].setdefault(value, []).append(row)
+
+    def candidate_rows(self, filters: dict):
+        """
+        Row positions matching every non-empty filter, or None for "all rows".
+        """
+        rows = None
+        for field, value in filters.items():
+            if not value:
+                continue
+            posting = self.postings[field].get(normalize_filter_value(value), [])
+            rows = set(posting) if rows is None else rows & set(posting)
+            if not rows:
+                break
+        if rows is None:
+            return None
+        return np.fromiter(sorted(rows), dtype=np.intp, count=len(rows))
+
+    def add_job(self, job: Job):
+        """Hook for /hr/post-job so the posting is searchable right away."""
+        if self.vectorizer is None:
+            return  # not loaded yet, sync() will pick the job up
+        self.add_jobs([job_to_dict(job)])
+
+    def needs_refit(self) -> bool:
+        return self.added_since_fit > REFIT_RATIO * max(self.fitted_size, 1)
+
+    def sync(self, db: Session):
+        """
+        Make sure the index covers every job in the database.
+
+        Other workers can post jobs too, so only the jobs committed since the
+        last sync are loaded (see ``IdWatermark``). The first fit and refits
+        are started in the background (``refit_in_background``); until the
+        first one is done the index stays empty.
+        """
+        with self.watermark.lock:
+            if self.vectorizer is None:
+                self.refit_in_background()
+                return
+
+            job_ids = self.watermark.pending_ids(db)
+            if job_ids:
+                self.add_jobs(get_all_jobs(db, job_ids=job_ids))
+                self.watermark.mark_loaded(job_ids)
+
+            if self.needs_refit():
+                self.refit_in_background()
+
+    def refit_in_background(self):
+        """Start a refit thread, unless one is already running."""
+        with self._refit_thread_lock:
+            if self._refit_thread is None or not self._refit_thread.is_alive():
+                self._refit_thread = threading.Thread(target=self._refit_in_thread, name="job-index-refit", daemon=True)
+                self._refit_thread.start()
+            return self._refit_thread
+
+    def _refit_in_thread(self):
+        db = SessionLocal()
+        try:
+            self.refit(db)
+        except Exception as e:
+            logger.error(f"Error refitting the job index: {e}")
+        finally:
+            db.close()
+
+    def refit(self, db: Session):
+        """
+        Fit a new vocabulary and matrix on every job in the database and swap
+        them in. Only the swap holds the locks; jobs committed while fitting
+        are added with the new vocabulary right after it.
+        """
+        # a process' first fit lands on (about) the vocabulary the stored scores
+        # came from; only later refits replace it
+        refitting = self.vectorizer is not None
+        job_list = get_all_jobs(db)
+        vectorizer = matrix = None
+        if job_list:
+            vectorizer = TfidfVectorizer()
+            matrix = vectorizer.fit_transform([get_job_text(job) for job in job_list])
+
+        with self.watermark.lock:
+            self.watermark.reset()
+            self.watermark.mark_loaded([job["id"] for job in job_list])
+            if vectorizer is not None:
+                self._swap(vectorizer, matrix, job_list)
+                job_ids = self.watermark.pending_ids(db)
+                if job_ids:
+                    self.add_jobs(get_all_jobs(db, job_ids=job_ids))
+                    self.watermark.mark_loaded(job_ids)
+            self.watermark.loaded = True
+
+        if refitting and vectorizer is not None:
+            for listener in self.refit_listeners:
+                listener()
+
+    def transform(self, texts):
+        """Vectorize texts with the fitted vocabulary (rows are L2-normalised)."""
+        with self._lock:
+            vectorizer = self.vectorizer
+        return vectorizer.transform(texts)
+
+    def score(self, user_text: str, filters: dict = None):
+        """
+        Cosine similarity of the user text against the indexed jobs.
+
+        Returns ``(jobs, rows, similarities)``: the job list the positions
+        refer to (a refit may swap in a new one right after), the positions
+        that passed the filters (None when unfiltered) and their scores in
+        the same order.
+        """
+        with self._lock:
+            vectorizer, matrix, jobs = self.vectorizer, self.matrix, self.jobs
+            rows = self.candidate_rows(filters or {})
+        if rows is not None:
+            if len(rows) == 0:
+                return jobs, rows, np.zeros(0)
+            matrix = matrix[rows]
+        user_vector = vectorizer.transform([user_text])
+        # rows are L2-normalised, so the dot product is the cosine similarity
+        similarities = (matrix @ user_vector.T).toarray().ravel()
+        return jobs, rows, similarities
+
+
+job_index = JobIndex()
+
+
+def build_job_index_in_background():
+    """First fit of the job index, off the request path (app startup)."""
+    return job_index.refit_in_background()
+
+
+def is_profile_complete(user_profile) -> bool:
+    return any([user_profile.get("skills"), user_profile.get("experience"), user_profile.get("projects")])
+
+def get_user_text(user_profile) -> str:
     # Combine user skills, experience, and projects into one text
-    user_text = " ".join(user_profile["skills"] + user_profile["experience"] + user_profile["projects"])
+    return " ".join(user_profile["skills"] + user_profile["experience"] + user_profile["projects"])
 
-    # Extract job descriptions
-    job_texts = [job["description"] + " " + job["title"] for job in job_list]
+def top_k_indices(similarities, k: int):
+    """
+    Indices of the k highest scores, best first, without sorting everything.
 
-    # TF-IDF Vectorization
-    vectorizer = TfidfVectorizer()
-    vectors = vectorizer.fit_transform([user_text] + job_texts)
+    Ties are broken by index, so the result is a prefix of one total order
+    whatever ``k`` is and consecutive pages neither repeat nor skip jobs.
+    """
+    n = len(similarities)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    if k < n:
+        # every index tied with the k-th best, so the tie-break sees all of them
+        kth = np.partition(similarities, n - k)[n - k]
+        candidates = np.flatnonzero(similarities >= kth)
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -similarities[candidates]))[:k]]
 
-    # Compute Cosine Similarity (user vs all jobs)
-    similarities = cosine_similarity(vectors[0], vectors[1:])[0]
+def compute_similarity(user_profile, db: Session, limit: int = 10, offset: int = 0, filters: dict = None):
+    """
+    Score the user against the job index and return one page of the ranking.
 
-    # Assign scores to jobs
-    for i, job in enumerate(job_list):
-        job["score"] = similarities[i]
+    ``filters`` maps location / work_type / job_type to the wanted value and is
+    resolved through the index before scoring, so only matching jobs are
+    scored. Only the top ``offset + limit`` jobs are selected (argpartition)
+    and turned into response dicts. Returns ``(jobs, total)`` where total is
+    the number of jobs that were scored. Raises ``JobIndexNotReady`` until
+    the first fit of the index is done.
+    """
+    job_index.sync(db)
+    if job_index.vectorizer is None:
+        if job_index.watermark.loaded:
+            return [], 0    # fitted, but there are no jobs
+        raise JobIndexNotReady("Job recommendations are still being prepared")
 
-    # Sort jobs by highest similarity score
-    job_list.sort(key=lambda x: x["score"], reverse=True)
+    jobs, rows, similarities = job_index.score(get_user_text(user_profile), filters)
 
-    return job_list
+    # Assign scores to the requested page only
+    page = top_k_indices(similarities, offset + limit)[offset:]
+    job_list = [
+        dict(jobs[i if rows is None else rows[i]], score=float(similarities[i]))
+        for i in page
+    ]
+
+    return job_list, len(similarities)
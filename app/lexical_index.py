@@ -0,0 +1,162 @@
+"""
+BM25 inverted index over candidate profiles for lexical / hybrid search.
+
+Documents are the ``get_user_profile_text`` of each user (skills,
+experience, projects, certifications) plus the bio. The index lives in
+process memory, is built once from the database and is then updated per
+user, so exact terms such as "kubernetes" or "saa" resolve through the
+postings lists without touching the vector store.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.index_sync import IdWatermark
+from app.models import User
+from app.profiles import load_user_profiles
+from app.ranking_system import get_user_profile_text
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+LOAD_BATCH_SIZE = 1000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text: str):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def get_user_search_text(user: User) -> str:
+    return f"{get_user_profile_text(user)} {user.bio or ''}"
+
+
+class BM25Index:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}      # term -> {doc_id: term frequency}
+        self.doc_terms = {}     # doc_id -> Counter, needed to remove a document
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.watermark = IdWatermark(User.id)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def add_document(self, doc_id, text: str):
+        """Index (or re-index) one document."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[doc_id]
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove_document(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def search(self, query: str, top_k: int = 10, ids=None):
+        """
+        Best ``top_k`` documents as ``(doc_id, score)``, best first.
+
+        ``ids`` (a set of doc ids) restricts scoring to those documents.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            if not n_docs:
+                return []
+            average_length = self.total_length / n_docs
+            scores = Counter()
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                if ids is not None:
+                    # filtered in posting order, so ties rank as in the unfiltered search
+                    posting = {doc_id: frequency for doc_id, frequency in posting.items() if doc_id in ids}
+                for doc_id, frequency in posting.items():
+                    length_norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / average_length
+                    scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    # ---- keeping the index in step with the users table ----
+
+    def add_user(self, user: User):
+        self.add_document(str(user.id), get_user_search_text(user))
+
+    def sync(self, db: Session):
+        """
+        Index users we have not seen yet.
+
+        The first call builds the whole index in batches; later calls only
+        load users committed since (see ``IdWatermark``), so users registered
+        through another worker or the bulk import are picked up incrementally.
+        """
+        with self.watermark.lock:
+            user_ids = self.watermark.pending_ids(db)
+            for start in range(0, len(user_ids), LOAD_BATCH_SIZE):
+                batch = user_ids[start:start + LOAD_BATCH_SIZE]
+                for user in load_user_profiles(db, user_ids=batch):
+                    self.add_user(user)
+                self.watermark.mark_loaded(batch)
+            self.watermark.loaded = True
+
+    def refresh_users(self, user_ids):
+        """Re-index users after a profile change or an import (background task)."""
+        if not self.watermark.loaded:
+            return  # the first sync() indexes them anyway
+        db = SessionLocal()
+        try:
+            users = {user.id: user for user in load_user_profiles(db, user_ids=user_ids)}
+            for user_id in user_ids:
+                if user_id in users:
+                    self.add_user(users[user_id])
+                else:
+                    self.remove_document(str(user_id))
+        except Exception as e:
+            logger.error(f"Error indexing profiles of users {user_ids[:10]}: {e}")
+        finally:
+            db.close()
+
+    def refresh_user(self, user_id: int):
+        self.refresh_users([user_id])
+
+
+profile_index = BM25Index()
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """
+    Fuse several best-first lists of ids: score(id) = sum of 1 / (k + rank).
+
+    Returns ``(id, score)`` pairs, best first.
+    """
+    scores = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,69 @@
+"""
+Shared chat model for the mock-interview prompts.
+
+One ``ChatOpenAI`` (and so one pooled HTTP client) per process, created
+lazily through the service registry off the event loop, or at startup when
+``llm`` is in ``settings.warm_up_services``. Prompts are run with
+``ainvoke`` so a slow completion only suspends its own request; at most
+``settings.llm_max_concurrency`` calls are in flight per worker and each one,
+including the wait for a slot, is bounded by ``settings.llm_timeout``.
+"""
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services import services
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = "gpt-4o"
+LLM_TEMPERATURE = 0.3
+
+_semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+
+
+def create_llm():
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        api_key=settings.api_key,
+        base_url=settings.base_url,
+        temperature=LLM_TEMPERATURE,
+        timeout=settings.llm_timeout,
+        max_retries=settings.llm_max_retries,
+    )
+
+
+async def get_llm():
+    """
+    The shared chat model, or None when it cannot be created (callers fall back).
+
+    The first call imports langchain and builds the client, which takes long
+    enough to stall every request on the worker, so it runs in the threadpool.
+    """
+    service = services["llm"]
+    if service.loaded:
+        return service.get()
+    try:
+        return await run_in_threadpool(service.get)
+    except Exception as e:
+        logger.error(f"Error initializing ChatOpenAI: {e}")
+        return None
+
+
+async def invoke_prompt(llm, prompt, variables: dict) -> str:
+    """
+    Run ``prompt | llm`` without blocking the event loop.
+
+    Raises ``asyncio.TimeoutError`` when no answer is back within
+    ``settings.llm_timeout`` seconds.
+    """
+    async def call():
+        async with _semaphore:
+            return await (prompt | llm).ainvoke(variables)
+
+    message = await asyncio.wait_for(call(), settings.llm_timeout)
+    return message.content
@@ -1,10 +1,16 @@
 from fastapi import FastAPI
 from app.routers import hr,job,users,auth
 from app.database import engine
+from app.migrations import run_migrations
+from app.services import warm_up_in_background, shutdown as shutdown_services
+from app.ranking_system import build_scoring_model_in_background
+from app.job_recommendation import build_job_index_in_background
 from . import models
 
 app = FastAPI()
 models.Base.metadata.create_all(engine)
+# indexes/constraints create_all cannot add to existing tables
+run_migrations(engine)
 
 app.include_router(hr.router)
 #app.include_router(job.router)
@@ -12,7 +18,33 @@ app.include_router(users.router)
 # app.include_router(auth.router)
 
 
+@app.on_event("startup")
+def start_background_workers():
+    users.embedding_worker.start()
+    # Heavy models and clients load lazily; optionally build them now
+    warm_up_in_background()
+    # First fit of the application scoring model and the job index, off the request path
+    build_scoring_model_in_background()
+    build_job_index_in_background()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    users.embedding_worker.stop()
+    shutdown_services()
+
+
 from fastapi.middleware.cors import CORSMiddleware
+from app.audio import UploadSizeLimit
+from app.config import settings
+
+# Audio uploads are refused by size before Starlette spools the body to disk
+# (multipart overhead on top of the audio itself is small, 64 KB covers it)
+app.add_middleware(UploadSizeLimit, limits={
+    "/user/mock-interview": lambda: settings.max_audio_upload_bytes + 64 * 1024,
+    "/user/mock-interview/transcribe": lambda: settings.max_audio_upload_bytes + 64 * 1024,
+    "/user/mock-interview/transcribe-batch": lambda: settings.max_audio_batch_upload_bytes,
+})
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,81 @@
+"""
+Schema changes ``create_all`` cannot make on an existing database.
+
+``Base.metadata.create_all`` only creates missing tables; it never adds a
+constraint or an index to a table that is already there. ``run_migrations``
+applies those by hand, idempotently, on every startup:
+
+- ``skills.skill_name`` / ``languages.language_name`` get their unique index
+  (``_resolve_names`` relies on it for ``ON CONFLICT``). Rows with the same
+  name are merged into the lowest id first, links repointed.
+- ``job_applications`` gets the (job_id, match_score DESC, id DESC) index the
+  ranked applicant listing pages over.
+
+All uvicorn workers run this at boot, so it runs under a Postgres advisory
+lock in one transaction; the second worker waits and then finds nothing to do.
+"""
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key, any constant unique to this app
+MIGRATION_LOCK_ID = 720341
+
+# (lookup table, name column, link table, link column). The index names are
+# the ones Postgres gives a column-level UNIQUE, so on a database created
+# with the unique columns already in place IF NOT EXISTS is a no-op.
+UNIQUE_NAME_TABLES = [
+    ("skills", "skill_name", "user_skills", "skill_id"),
+    ("languages", "language_name", "user_languages", "language_id"),
+]
+
+# indexes declared in app.models on tables that predate them
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_job_applications_job_score "
+    "ON job_applications (job_id, match_score DESC, id DESC)",
+]
+
+
+def _merge_duplicate_names(connection, table: str, column: str, link_table: str, link_column: str) -> int:
+    """Point links at the lowest id per name and delete the other rows; returns rows deleted."""
+    keepers = f"SELECT {column}, MIN(id) AS id FROM {table} GROUP BY {column} HAVING COUNT(*) > 1"
+    connection.execute(text(f"""
+        INSERT INTO {link_table} (user_id, {link_column})
+        SELECT link.user_id, keep.id
+        FROM {link_table} link
+        JOIN {table} dup ON dup.id = link.{link_column}
+        JOIN ({keepers}) keep ON keep.{column} = dup.{column}
+        WHERE dup.id <> keep.id
+        ON CONFLICT DO NOTHING
+    """))
+    connection.execute(text(f"""
+        DELETE FROM {link_table} link
+        USING {table} dup, ({keepers}) keep
+        WHERE dup.id = link.{link_column} AND keep.{column} = dup.{column} AND dup.id <> keep.id
+    """))
+    return connection.execute(text(f"""
+        DELETE FROM {table} dup
+        USING ({keepers}) keep
+        WHERE keep.{column} = dup.{column} AND dup.id <> keep.id
+    """)).rowcount
+
+
+def run_migrations(engine):
+    if engine.dialect.name != "postgresql":
+        # fresh SQLite (tests) is fully built by create_all
+        return
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+
+        for table, column, link_table, link_column in UNIQUE_NAME_TABLES:
+            merged = _merge_duplicate_names(connection, table, column, link_table, link_column)
+            if merged:
+                logger.info(f"Merged {merged} duplicate rows in {table}.{column}")
+            connection.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_{column}_key ON {table} ({column})"
+            ))
+
+        for statement in INDEXES:
+            connection.execute(text(statement))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Table,Text,Float
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Table,Text,Float,Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -46,14 +46,14 @@ class User(Base):
 class Skill(Base):
     __tablename__ = "skills"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    skill_name = Column(String, nullable=False)
+    skill_name = Column(String, nullable=False, unique=True)
     # Many-to-Many Relationship
     users = relationship("User", secondary=user_skills, back_populates="skills")
 
 class Language(Base):
     __tablename__ = "languages"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    language_name = Column(String, nullable=False)
+    language_name = Column(String, nullable=False, unique=True)
     # Many-to-Many Relationship
     users = relationship("User", secondary=user_languages, back_populates="languages")
 
@@ -143,3 +143,50 @@ class JobApplication(Base):
     # Relationships
     user = relationship("User", back_populates="applications")
     job = relationship("Job", back_populates="applications")
+
+    __table_args__ = (
+        # ranked applicant listing: every keyset page is one index range scan
+        Index("ix_job_applications_job_score", "job_id", match_score.desc(), id.desc()),
+    )
+
+
+#------------------Recommendation Schema---------------------#
+
+class UserRecommendation(Base):
+    """Precomputed top-N job matches per user, served by /user/jobs."""
+    __tablename__ = "user_recommendations"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # one user's ranking is a single range scan on this index
+        Index("ix_user_recommendations_user_score", "user_id", score.desc()),
+    )
+
+    job = relationship("Job")
+
+
+#------------------Embedding Queue Schema---------------------#
+
+class EmbeddingJob(Base):
+    """Pending bio embedding / vector upsert for a user, processed by app.embedding_queue."""
+    __tablename__ = "embedding_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_embedding_jobs_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_embedding_jobs_user_id", "user_id"),
+    )
+
+    user = relationship("User")
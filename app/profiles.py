@@ -0,0 +1,136 @@
+from typing import List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.models import User, Skill, Language, WorkExperience, Project, Certification
+from app.schemas import UserModel
+
+# Every relationship a full profile touches. Loading them with selectinload
+# costs one extra query per relationship no matter how many users are loaded,
+# instead of one lazy load per user and relationship.
+PROFILE_RELATIONSHIPS = (
+    User.skills,
+    User.languages,
+    User.experiences,
+    User.projects,
+    User.certifications,
+)
+
+
+def profile_load_options():
+    """Loader options that eager-load the whole profile graph of ``User``."""
+    return [selectinload(relationship) for relationship in PROFILE_RELATIONSHIPS]
+
+
+def load_user_profile(db: Session, user_id: int) -> Optional[User]:
+    """
+    Fetch one user with the full profile graph in a fixed number of queries.
+
+    Works for users already in the session too (e.g. the one returned by
+    get_current_user); the unloaded collections are filled in eagerly.
+    """
+    return (
+        db.query(User)
+        .options(*profile_load_options())
+        .filter(User.id == user_id)
+        .first()
+    )
+
+
+def load_user_profiles(db: Session, user_ids=None, after_id: int = None, limit: int = None) -> List[User]:
+    """
+    Fetch many users with their profiles, ordered by id.
+
+    All users when ``user_ids`` is None; ``after_id`` and ``limit`` page
+    through the table by id.
+    """
+    query = db.query(User).options(*profile_load_options())
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    query = query.order_by(User.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def clean_names(names) -> List[str]:
+    """Strip, drop empty and de-duplicate names, keeping their order."""
+    return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+
+
+def _resolve_names(db: Session, model, column, names) -> list:
+    """
+    Get-or-create lookup rows (skills, languages) for a list of names.
+
+    One INSERT ... ON CONFLICT DO NOTHING for the whole list followed by one
+    IN lookup, relying on the unique index on the name column. Safe against
+    concurrent registrations creating the same name. Nothing is committed.
+    """
+    names = clean_names(names)
+    if not names:
+        return []
+
+    db.execute(
+        insert(model.__table__)
+        .values([{column.key: name} for name in names])
+        .on_conflict_do_nothing(index_elements=[column.key])
+    )
+    rows = {getattr(row, column.key): row for row in db.query(model).filter(column.in_(names))}
+    return [rows[name] for name in names]
+
+
+def resolve_skills(db: Session, names) -> List[Skill]:
+    return _resolve_names(db, Skill, Skill.skill_name, names)
+
+
+def resolve_languages(db: Session, names) -> List[Language]:
+    return _resolve_names(db, Language, Language.language_name, names)
+
+
+def build_user(user: UserModel, skills_by_name: dict, languages_by_name: dict) -> User:
+    """
+    Build a pending ``User`` with its whole profile graph from a ``UserModel``.
+
+    Skill and language rows must already be resolved (see resolve_skills)
+    and are looked up by their cleaned name.
+    """
+    return User(
+        email=user.email,
+        name=user.name,
+        password=user.password,
+        location=user.location,
+        bio=user.bio,
+        skills=[skills_by_name[name] for name in clean_names(user.skills)],
+        languages=[languages_by_name[name] for name in clean_names(user.languages)],
+        experiences=[
+            WorkExperience(
+                company=exp.company,
+                position=exp.position,
+                location=exp.location,
+                start_date=exp.start_date,
+                end_date=exp.end_date,
+                currently_working=exp.currently_working,
+                description=exp.description
+            )
+            for exp in user.experiences
+        ],
+        projects=[
+            Project(
+                project_name=proj.project_name,
+                project_description=proj.project_description,
+                project_link=proj.project_link
+            )
+            for proj in user.projects
+        ],
+        certifications=[
+            Certification(
+                certification_name=cert.certification_name,
+                certification_provider=cert.certification_provider,
+                certificate_link=cert.certificate_link
+            )
+            for cert in user.certifications
+        ]
+    )
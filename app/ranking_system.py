@@ -1,7 +1,8 @@
 from app.database import get_db
 from sqlalchemy.orm import Session
 from fastapi import Depends
-from app.models import User, Job
+from app.models import User, Job, JobApplication
+from app.profiles import load_user_profiles, profile_load_options
 
 
 # user profile
@@ -25,21 +26,272 @@ def get_job_description_text(job: Job) -> str:
     return f"Title: {job.title}. Description: {job.description}"
 
 
+import fcntl
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import Float, Integer, column, func, update, values
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Refit the scoring model once the job + profile corpus has grown by this
+# fraction since the last fit.
+SCORING_REFIT_RATIO = 0.2
+
+# Rows per UPDATE ... FROM (VALUES ...) statement when re-scoring applicants
+RESCORE_BATCH_SIZE = 5000
+
+
+class ScoringModelNotReady(Exception):
+    pass
+
+
+class ApplicationScorer:
+    """
+    Shared TF-IDF model used to score job applications.
+
+    Vocabulary and IDF are fitted once over every job description and user
+    profile and persisted to ``settings.scoring_model_path``, so scores from
+    different jobs are on the same scale. Job vectors are cached per
+    ``job_id``; scoring an application is one transform of the profile text
+    and one sparse dot product.
+
+    Another worker's refit swaps the model in at any time (``load``), so
+    every scoring call takes one ``snapshot()`` and uses only that.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.vectorizer = None
+        self.version = None         # changes every time the model is refitted
+        self.corpus_size = 0
+        self._loaded_mtime = None
+        self._job_vectors = {}
+
+    def fit(self, db: Session):
+        """Fit the vocabulary over the whole job and profile corpus and persist it."""
+        corpus = [get_job_description_text(job) for job in db.query(Job).all()]
+        corpus += [get_user_profile_text(user, db) for user in load_user_profiles(db)]
+
+        vectorizer = TfidfVectorizer()
+        vectorizer.fit(corpus)
+        version = str(time.time_ns())
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # unique temp file, so two processes fitting at once cannot interleave writes
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"vectorizer": vectorizer, "version": version, "corpus_size": len(corpus)}, f)
+            os.replace(tmp_path, self.path)  # other workers never see a partial file
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self.vectorizer = vectorizer
+            self.version = version
+            self.corpus_size = len(corpus)
+            self._loaded_mtime = os.path.getmtime(self.path)
+            self._job_vectors = {}
+
+    def load(self) -> bool:
+        """(Re)load the persisted model if it changed on disk."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._loaded_mtime:
+            return True
+
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        with self._lock:
+            self.vectorizer = state["vectorizer"]
+            self.version = state["version"]
+            self.corpus_size = state.get("corpus_size", 0)
+            self._loaded_mtime = mtime
+            self._job_vectors = {}
+        return True
+
+    def snapshot(self):
+        """``(vectorizer, version, job vector cache)`` of one model version."""
+        with self._lock:
+            return self.vectorizer, self.version, self._job_vectors
+
+    def job_vector(self, job: Job, model=None):
+        vectorizer, version, job_vectors = model or self.snapshot()
+        vector = job_vectors.get(job.job_id)
+        if vector is None:
+            vector = vectorizer.transform([get_job_description_text(job)])
+            with self._lock:
+                # a vector of the old vocabulary must not land in a new model's cache
+                if self.version == version:
+                    job_vectors[job.job_id] = vector
+        return vector
+
+    def score(self, user_text: str, job: Job) -> float:
+        model = self.snapshot()
+        user_vector = model[0].transform([user_text])
+        # rows are L2-normalised, so the dot product is the cosine similarity
+        return float(user_vector.multiply(self.job_vector(job, model)).sum())
+
+
+scorer = ApplicationScorer(settings.scoring_model_path)
+
+
+_build_lock = threading.Lock()
+_build_thread = None
+
+
+def pairwise_similarity(user_text: str, job: Job) -> float:
+    """TF-IDF fitted on just this pair; only used until the shared model exists."""
+    tfidf_matrix = TfidfVectorizer().fit_transform([user_text, get_job_description_text(job)])
+    return float(cosine_similarity(tfidf_matrix[0], tfidf_matrix[1])[0][0])
 
-def calculate_similarity(user_text: str, job_text: str) -> float:
+
+def calculate_similarity(user_text: str, job: Job, db: Session) -> float:
     """Calculate the similarity score between user profile and job description."""
-    
-    vectorizer = TfidfVectorizer()
-    
-    # Transform both texts into vectors
-    tfidf_matrix = vectorizer.fit_transform([user_text, job_text])
-    
-    # Compute cosine similarity
-    similarity = cosine_similarity(tfidf_matrix[0], tfidf_matrix[1])
-    
-    return similarity[0][0]  # Extract the similarity score
+
+    if not scoring_model_ready():
+        # re-scored onto the shared scale once the model is built
+        return pairwise_similarity(user_text, job)
+    return scorer.score(user_text, job)
+
+
+def rescore_job_applications(job: Job, db: Session) -> int:
+    """
+    Recompute match_score for every applicant of a job in one vectorized pass.
+
+    All applicant profiles are transformed into one sparse matrix and scored
+    with a single matrix-vector product against the cached job vector; the
+    results are written back with UPDATE ... FROM (VALUES ...) statements.
+    Returns the number of applications updated. Raises
+    ``ScoringModelNotReady`` while the shared model is still being built.
+    """
+    if not scoring_model_ready():
+        raise ScoringModelNotReady("The scoring model is still being built")
+
+    applications = (
+        db.query(JobApplication.id, User)
+        .join(User, JobApplication.user_id == User.id)
+        .options(*profile_load_options())
+        .filter(JobApplication.job_id == job.job_id)
+        .all()
+    )
+    if not applications:
+        return 0
+
+    model = scorer.snapshot()
+    user_matrix = model[0].transform(
+        [get_user_profile_text(user, db) for _, user in applications]
+    )
+    scores = (user_matrix @ scorer.job_vector(job, model).T).toarray().ravel()
+
+    rows = [(app_id, float(score)) for (app_id, _), score in zip(applications, scores)]
+    for start in range(0, len(rows), RESCORE_BATCH_SIZE):
+        new_scores = values(
+            column("id", Integer), column("match_score", Float), name="new_scores"
+        ).data(rows[start:start + RESCORE_BATCH_SIZE])
+        db.execute(
+            update(JobApplication)
+            .where(JobApplication.id == new_scores.c.id)
+            .values(match_score=new_scores.c.match_score)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return len(rows)
+
+
+def rescore_all_applications(db: Session) -> int:
+    """Re-score the applicants of every job that has any."""
+    jobs = (
+        db.query(Job)
+        .filter(Job.job_id.in_(db.query(JobApplication.job_id).distinct()))
+        .all()
+    )
+    return sum(rescore_job_applications(job, db) for job in jobs)
+
+
+def refit_scoring_model(db: Session):
+    """Refit the model and bring every stored match_score onto the new scale."""
+    scorer.fit(db)
+    rescored = rescore_all_applications(db)
+    logger.info(f"Scoring model refitted on {scorer.corpus_size} documents, {rescored} applications re-scored")
+
+
+def scoring_model_ready() -> bool:
+    """Load the persisted model; if there is none yet, start building it in the background."""
+    if scorer.load():
+        return True
+    build_scoring_model_in_background()
+    return False
+
+
+@contextmanager
+def _refit_lock():
+    """Yields False instead of waiting when another process is already fitting."""
+    os.makedirs(os.path.dirname(scorer.path) or ".", exist_ok=True)
+    with open(f"{scorer.path}.lock", "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def refresh_scoring_model():
+    """
+    Build the scoring model if there is none, or refit it when the corpus has
+    outgrown it.
+
+    Runs in the background (startup, after new jobs are posted, first apply
+    without a model), never inside a request. Whenever the model changes,
+    every stored match_score is recomputed so HR rankings stay comparable
+    with scores of new applications. One process fits at a time; the others
+    pick the new file up on their next load().
+    """
+    db = SessionLocal()
+    try:
+        with _refit_lock() as acquired:
+            if not acquired:
+                return
+            if not scorer.load():
+                refit_scoring_model(db)
+                return
+            corpus_size = db.query(func.count(Job.id)).scalar() + db.query(func.count(User.id)).scalar()
+            if corpus_size > scorer.corpus_size * (1 + SCORING_REFIT_RATIO):
+                refit_scoring_model(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error refreshing scoring model: {e}")
+    finally:
+        db.close()
+
+
+def build_scoring_model_in_background():
+    """Run refresh_scoring_model in a thread, unless one is already running in this process."""
+    global _build_thread
+    with _build_lock:
+        if _build_thread is None or not _build_thread.is_alive():
+            _build_thread = threading.Thread(target=refresh_scoring_model, name="scoring-model", daemon=True)
+            _build_thread.start()
+        return _build_thread
 
 
 # @router.post("/apply/{job_id}")
@@ -0,0 +1,243 @@
+import logging
+import threading
+
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Job, UserRecommendation
+from app.profiles import load_user_profile, load_user_profiles
+from app.job_recommendation import (
+    build_user_profile, compute_similarity, get_user_text, is_profile_complete,
+    job_index, job_to_dict, get_job_text, top_k_indices, JobIndexNotReady,
+)
+
+logger = logging.getLogger(__name__)
+
+# How many matches are materialized per user
+RECOMMENDATION_SIZE = 100
+
+# Users are vectorized in chunks when a new job is scored against everyone
+USER_BATCH_SIZE = 500
+
+# pg_try_advisory_xact_lock key: one worker at a time rebuilds every list
+REBUILD_LOCK_ID = 720342
+
+
+def get_materialized_recommendations(db: Session, user_id: int, limit: int, offset: int):
+    """
+    Read one page of a user's precomputed recommendations.
+
+    A single query on the (user_id, score) index; the window count gives the
+    number of materialized rows and a scalar subquery the number of jobs,
+    without a second round trip. Returns ``(jobs, total)`` or ``None`` when
+    the table can not answer the request (nothing built yet, or the page runs
+    past the materialized top-N). ``total`` is the number of jobs ranked, as
+    on the live ``compute_similarity`` path, not the number materialized.
+    """
+    job_count = db.query(func.count(Job.id)).scalar_subquery()
+    rows = (
+        db.query(
+            Job,
+            UserRecommendation.score,
+            func.count().over().label("materialized"),
+            job_count.label("total"),
+        )
+        .join(UserRecommendation, UserRecommendation.job_id == Job.id)
+        .filter(UserRecommendation.user_id == user_id)
+        .order_by(UserRecommendation.score.desc(), UserRecommendation.job_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    if not rows:
+        return None
+
+    materialized = rows[0].materialized
+    if materialized >= RECOMMENDATION_SIZE and offset + limit > materialized:
+        return None  # the tail beyond top-N has to be computed live
+
+    jobs = [dict(job_to_dict(job), score=score) for job, score, _, _ in rows]
+    return jobs, rows[0].total
+
+
+def store_user_recommendations(db: Session, user_id: int, recommended_jobs):
+    db.query(UserRecommendation).filter(UserRecommendation.user_id == user_id).delete(
+        synchronize_session=False
+    )
+    db.bulk_insert_mappings(UserRecommendation, [
+        {"user_id": user_id, "job_id": job["id"], "score": job["score"]}
+        for job in recommended_jobs
+    ])
+
+
+def refresh_user_recommendations(user_id: int):
+    """
+    Recompute and store the top-N jobs of one user.
+
+    Runs as a background task after registration (or any profile change) and
+    on the first /user/jobs visit.
+    """
+    db = SessionLocal()
+    try:
+        user = load_user_profile(db, user_id)
+        if not user:
+            return
+        user_profile = build_user_profile(user)
+        if not is_profile_complete(user_profile):
+            return
+
+        recommended_jobs, _ = compute_similarity(user_profile, db, limit=RECOMMENDATION_SIZE)
+        store_user_recommendations(db, user_id, recommended_jobs)
+        db.commit()
+    except JobIndexNotReady:
+        db.rollback()   # built on the next visit once the index is fitted
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error refreshing recommendations for user {user_id}: {e}")
+    finally:
+        db.close()
+
+
+def refresh_recommendations_for_job(job_id: int):
+    """
+    Merge a newly posted job into every materialized recommendation list.
+
+    The job is scored against all users that already have rows, in batches of
+    one sparse matrix-vector product each. It is only inserted where it beats
+    the user's current N-th best score, and the lists are then trimmed back
+    to N, so untouched users cost nothing beyond the product. A user whose
+    list was rebuilt after the job was indexed may hold it already; that row
+    gets the new score instead of failing the whole merge.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            return
+        job_index.sync(db)
+        if job_index.vectorizer is None:
+            return
+        job_vector = job_index.transform([get_job_text(job_to_dict(job))])
+
+        # current size and lowest score of every materialized list
+        thresholds = {
+            user_id: (count, min_score)
+            for user_id, count, min_score in db.query(
+                UserRecommendation.user_id,
+                func.count(),
+                func.min(UserRecommendation.score),
+            ).group_by(UserRecommendation.user_id)
+        }
+        user_ids = sorted(thresholds)
+
+        touched = []
+        for start in range(0, len(user_ids), USER_BATCH_SIZE):
+            batch_ids = user_ids[start:start + USER_BATCH_SIZE]
+            users = load_user_profiles(db, batch_ids)
+            profiles = [(user.id, build_user_profile(user)) for user in users]
+            profiles = [(uid, profile) for uid, profile in profiles if is_profile_complete(profile)]
+            if not profiles:
+                continue
+
+            user_matrix = job_index.transform([get_user_text(profile) for _, profile in profiles])
+            scores = (user_matrix @ job_vector.T).toarray().ravel()
+
+            new_rows = []
+            for (user_id, _), score in zip(profiles, scores):
+                count, min_score = thresholds[user_id]
+                if count < RECOMMENDATION_SIZE or score > min_score:
+                    new_rows.append({"user_id": user_id, "job_id": job.id, "score": float(score)})
+            if new_rows:
+                statement = insert(UserRecommendation.__table__).values(new_rows)
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=[UserRecommendation.user_id, UserRecommendation.job_id],
+                    set_={"score": statement.excluded.score},
+                ))
+                touched.extend(row["user_id"] for row in new_rows)
+
+        if touched:
+            trim_recommendations(db, touched)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error merging job {job_id} into recommendations: {e}")
+    finally:
+        db.close()
+
+
+def trim_recommendations(db: Session, user_ids):
+    """Delete everything past the top-N for the given users."""
+    ranked = (
+        db.query(
+            UserRecommendation.user_id,
+            UserRecommendation.job_id,
+            func.row_number().over(
+                partition_by=UserRecommendation.user_id,
+                order_by=(UserRecommendation.score.desc(), UserRecommendation.job_id),
+            ).label("position"),
+        )
+        .filter(UserRecommendation.user_id.in_(user_ids))
+        .subquery()
+    )
+    overflow = db.query(ranked.c.user_id, ranked.c.job_id).filter(
+        ranked.c.position > RECOMMENDATION_SIZE
+    )
+    db.query(UserRecommendation).filter(
+        tuple_(UserRecommendation.user_id, UserRecommendation.job_id).in_(overflow)
+    ).delete(synchronize_session=False)
+
+
+def rebuild_all_recommendations():
+    """
+    Recompute every materialized list with the current job index.
+
+    Stored scores are only comparable with new ones while the vocabulary they
+    were computed with is in use, so this runs after every ``JobIndex`` refit.
+    Users are loaded and vectorized in batches; the whole rebuild is one
+    transaction, so readers see either the old lists or the new ones.
+    """
+    db = SessionLocal()
+    try:
+        # every worker refits on its own; one rebuild at a time is enough
+        if db.bind.dialect.name == "postgresql" and not db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REBUILD_LOCK_ID}
+        ).scalar():
+            return
+        if job_index.vectorizer is None:
+            return
+
+        user_ids = [user_id for (user_id,) in db.query(UserRecommendation.user_id).distinct()]
+        rebuilt = 0
+        for start in range(0, len(user_ids), USER_BATCH_SIZE):
+            users = load_user_profiles(db, user_ids[start:start + USER_BATCH_SIZE])
+            profiles = [(user.id, build_user_profile(user)) for user in users]
+            profiles = [(user_id, profile) for user_id, profile in profiles if is_profile_complete(profile)]
+            if not profiles:
+                continue
+
+            for user_id, profile in profiles:
+                jobs, _, similarities = job_index.score(get_user_text(profile))
+                store_user_recommendations(db, user_id, [
+                    {"id": jobs[i]["id"], "score": float(similarities[i])}
+                    for i in top_k_indices(similarities, RECOMMENDATION_SIZE)
+                ])
+            rebuilt += len(profiles)
+            db.flush()
+            db.expunge_all()  # keep the session small
+        db.commit()
+        logger.info(f"Rebuilt materialized recommendations of {rebuilt} users after a job index refit")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding recommendations: {e}")
+    finally:
+        db.close()
+
+
+def rebuild_all_recommendations_in_background():
+    threading.Thread(target=rebuild_all_recommendations, name="recommendation-rebuild", daemon=True).start()
+
+
+# stored scores follow the job index vocabulary
+job_index.refit_listeners.append(rebuild_all_recommendations_in_background)
@@ -1,23 +1,28 @@
 
-from fastapi import APIRouter,HTTPException ,Depends,Response,status
+from fastapi import APIRouter,HTTPException ,Depends,Response,status,BackgroundTasks,Query,File,UploadFile
+import io
+import json
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
+from typing import Optional
 from app.models import HR,Job,JobApplication,User
 from sqlalchemy.orm import Session
 from app.schemas import HrModel,HrLogin,HrResponseModel,JobCreate
 from app.database import get_db
 from app.oauth2 import create_access_token,get_current_hr
-from pinecone import Pinecone
+from app.utils import encode_cursor, decode_cursor
+from app.job_recommendation import job_index
+from app.recommendation_builder import refresh_recommendations_for_job
+from app.ranking_system import refresh_scoring_model, rescore_job_applications, ScoringModelNotReady
+from app.profiles import load_user_profile
+from app.bulk_import import import_users, detect_format, READERS
+from app.embedding_queue import get_queue_stats
+from app.lexical_index import profile_index, reciprocal_rank_fusion
+from app.skill_bitmap import skill_index
 
 
 from app.models import User
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
-import os
-from dotenv import load_dotenv
-
-# Load API key from .env file
-load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+from app.services import get_embeddings, get_vector_store, service_status, services
 
 
 router = APIRouter(
@@ -112,7 +117,12 @@ def view_hr_profile(
 
 
 @router.post("/post-job", status_code=status.HTTP_201_CREATED)
-def post_job(job_data: JobCreate, db: Session = Depends(get_db), current_hr: HR = Depends(get_current_hr)):
+def post_job(
+    job_data: JobCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_hr: HR = Depends(get_current_hr)
+):
     """
     - Allows authenticated HRs to post jobs.
     - Requires a valid access token.
@@ -133,6 +143,13 @@ def post_job(job_data: JobCreate, db: Session = Depends(get_db), current_hr: HR
     db.commit()
     db.refresh(new_job)
 
+    # Make the posting available to /user/jobs without refitting the index
+    job_index.add_job(new_job)
+    # Merge the job into the materialized per-user recommendations
+    background_tasks.add_task(refresh_recommendations_for_job, new_job.id)
+    # Refit the application scoring model (and re-score) if the corpus outgrew it
+    background_tasks.add_task(refresh_scoring_model)
+
     return {"message": "Job posted successfully"}
 
 
@@ -153,9 +170,18 @@ def get_hr_jobs(current_hr: HR = Depends(get_current_hr), db: Session = Depends(
 @router.get("/jobs/{job_id}/applicants")
 def get_job_applicants(
     job_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    min_score: Optional[float] = None,
     hr=Depends(get_current_hr),  # Ensure only HRs can access this
     db: Session = Depends(get_db)
 ):
+    """
+    Applicants of a job ranked by match_score, best first.
+
+    Keyset pagination over (match_score, id): pass the returned `next_cursor`
+    to get the next page. `min_score` drops applicants below the threshold.
+    """
     # Fetch job using `job_id` (not `id`) to check ownership
     job = db.query(Job).filter(Job.job_id == job_id).first()
     if not job:
@@ -165,27 +191,84 @@ def get_job_applicants(
     if job.hr_id != hr.id:
         raise HTTPException(status_code=403, detail="You are not authorized to view applicants for this job")
 
-    # Fetch applicants for this job
-    applications = (
-    db.query(JobApplication)
-    .join(User, JobApplication.user_id == User.id)
-    .filter(JobApplication.job_id == job.job_id)  # Use job.job_id instead of job.id
-    .all()
+    # Fetch applicants for this job, walking ix_job_applications_job_score
+    query = (
+        db.query(
+            JobApplication.id,
+            JobApplication.match_score,
+            JobApplication.applied_at,
+            User.id.label("user_id"),
+            User.name,
+            User.email,
+        )
+        .join(User, JobApplication.user_id == User.id)
+        .filter(JobApplication.job_id == job.job_id)  # Use job.job_id instead of job.id
+    )
+    if min_score is not None:
+        query = query.filter(JobApplication.match_score >= min_score)
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            last_score, last_id = float(position["score"]), int(position["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(JobApplication.match_score, JobApplication.id) < tuple_(last_score, last_id)
+        )
+
+    # one extra row tells us whether there is a next page
+    rows = (
+        query.order_by(JobApplication.match_score.desc(), JobApplication.id.desc())
+        .limit(limit + 1)
+        .all()
     )
+    page = rows[:limit]
 
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor({"score": last.match_score, "id": last.id})
 
-    
     # Format response
-    return [
-        {
-            "user_id": app.user.id,
-            "name": app.user.name,
-            "email": app.user.email,
-            "applied_at": app.applied_at
-        }
-        for app in applications
-        
-    ]
+    return {
+        "applicants": [
+            {
+                "user_id": row.user_id,
+                "name": row.name,
+                "email": row.email,
+                "applied_at": row.applied_at,
+                "match_score": round(row.match_score, 4)
+            }
+            for row in page
+        ],
+        "next_cursor": next_cursor
+    }
+
+
+# re-score every applicant of a job against the current scoring model
+@router.post("/jobs/{job_id}/rescore")
+def rescore_job_applicants(
+    job_id: int,
+    hr=Depends(get_current_hr),
+    db: Session = Depends(get_db)
+):
+    job = db.query(Job).filter(Job.job_id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Ensure the HR owns this job
+    if job.hr_id != hr.id:
+        raise HTTPException(status_code=403, detail="You are not authorized to re-score applicants for this job")
+
+    try:
+        rescored = rescore_job_applications(job, db)
+    except ScoringModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"job_id": job.job_id, "rescored": rescored}
 
 
 # view user profile from hr side
@@ -195,7 +278,7 @@ def get_user_profile(user_id: int, db: Session = Depends(get_db)):
     """
     Fetch the complete profile of a user by their user_id.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = load_user_profile(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -241,44 +324,258 @@ def get_user_profile(user_id: int, db: Session = Depends(get_db)):
 
 
 
-# Initialize Google Generative AI Embeddings
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index("candidate-search")
+@router.get("/embedding-queue")
+def embedding_queue_stats(hr=Depends(get_current_hr), db: Session = Depends(get_db)):
+    """
+    Status of the bio embedding queue that feeds candidate search.
+    """
+    return get_queue_stats(db)
+
+@router.get("/embedding-cache")
+def embedding_cache_stats(hr=Depends(get_current_hr)):
+    """
+    Hit / miss counters of the shared embedding cache.
+    """
+    return get_embeddings().stats()
+
+@router.get("/services")
+def services_status(hr=Depends(get_current_hr)):
+    """
+    Which lazily loaded models / clients this worker has created, and how long each took.
+    """
+    return service_status()
+
+@router.get("/transcription-queue")
+def transcription_queue_stats(hr=Depends(get_current_hr)):
+    """
+    Queue depth, rejections, timeouts and inference times of the Whisper pool.
+    """
+    transcription = services["transcription"]
+    if not transcription.loaded:
+        return {"started": False}
+    return {"started": True, **transcription.get().stats()}
+
+# Largest top_k the vector index accepts (Pinecone's limit)
+MAX_SEARCH_DEPTH = 10000
+# Rows returned per NDJSON stream at most
+MAX_STREAM_LIMIT = 1000
+
+
+# Candidates taken from each ranking before fusing them in hybrid mode. Fixed,
+# so every page is cut from the same fused list
+HYBRID_FUSION_DEPTH = 1000
+
+
+def format_match(match):
+    formatted = {
+        "user_id": match["id"],
+        "email": match["metadata"].get("email"),
+        "name": match["metadata"].get("name"),
+        "score": round(match["score"], 4),
+    }
+    for key in ("vector_score", "lexical_score"):
+        if key in match:
+            formatted[key] = round(match[key], 4) if match[key] is not None else None
+    return formatted
+
+
+def hybrid_search(query: str, query_embedding, db: Session, ids=None, metadata_filter=None):
+    """
+    Fuse the vector ranking with BM25 over profile text (reciprocal rank fusion).
+
+    Both rankings are cut at HYBRID_FUSION_DEPTH, whatever page is asked for,
+    so pages sliced from the result never repeat or skip candidates.
+    Returns matches in the vector store's format, best first, where `score`
+    is the fused score and the per-ranking scores are kept alongside.
+    `ids` restricts both rankings to those user ids; `metadata_filter` is the
+    same set as a vector store filter (see `SkillBitmapIndex.metadata_filter`).
+    """
+    vector_matches = get_vector_store().query(
+        vector=query_embedding, top_k=HYBRID_FUSION_DEPTH, include_metadata=True,
+        ids=ids, metadata_filter=metadata_filter
+    )["matches"]
+
+    profile_index.sync(db)
+    lexical_matches = profile_index.search(query, top_k=HYBRID_FUSION_DEPTH, ids=ids)
+
+    vector_by_id = {match["id"]: match for match in vector_matches}
+    lexical_by_id = dict(lexical_matches)
+    fused = reciprocal_rank_fusion([
+        [match["id"] for match in vector_matches],
+        [doc_id for doc_id, _ in lexical_matches],
+    ])
+
+    # lexical-only hits have no vector metadata, fetch it in one query
+    missing = [int(doc_id) for doc_id, _ in fused if doc_id not in vector_by_id]
+    users = {
+        str(user_id): {"email": email, "name": name}
+        for user_id, email, name in db.query(User.id, User.email, User.name).filter(User.id.in_(missing))
+    } if missing else {}
+
+    return [
+        {
+            "id": doc_id,
+            "score": score,
+            "metadata": vector_by_id[doc_id]["metadata"] if doc_id in vector_by_id else users.get(doc_id, {}),
+            "vector_score": vector_by_id[doc_id]["score"] if doc_id in vector_by_id else None,
+            "lexical_score": lexical_by_id.get(doc_id),
+        }
+        for doc_id, score in fused
+    ]
+
 
 @router.get("/search")
-def search_users(query: str):
+def search_users(
+    query: str,
+    limit: int = Query(20, ge=1, le=MAX_STREAM_LIMIT),
+    cursor: Optional[str] = None,
+    min_score: Optional[float] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    mode: str = Query("vector", pattern="^(vector|hybrid)$"),
+    skills: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Search users based on HR's query using similarity search from Pinecone.
-    Returns all matching users.
+    Search users based on HR's query using similarity search in the vector store.
+
+    Returns one page of `limit` matches (at most 100 as JSON) with a
+    `next_cursor` for the following page; `min_score` cuts off weak matches.
+    `format=ndjson` streams the page one JSON object per line instead.
+    `mode=hybrid` also runs BM25 over skills, experience, projects and
+    certifications and fuses both rankings; `score` is then the fused score.
+    `skills` is a boolean skill filter (see `/hr/skill-search`) applied before
+    ranking, so only matching candidates are scored.
     """
+    if format == "json" and limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be at most 100 for JSON responses")
+
+    offset = 0
+    if cursor:
+        try:
+            offset = int(decode_cursor(cursor)["offset"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # ask the index only for what this page needs, plus one row to detect a next page
+    depth = min(offset + limit + 1, MAX_SEARCH_DEPTH)
+    if offset >= depth:
+        raise HTTPException(status_code=400, detail="Cursor is past the end of the results")
+
+    ids = metadata_filter = None
+    if skills:
+        ids = {str(user_id) for user_id in evaluate_skill_filter(skills, db)}
+        metadata_filter = skill_index.metadata_filter(skills)
+
     try:
         # Generate embedding for the query
-        query_embedding = embeddings.embed_query(query)
+        query_embedding = get_embeddings().embed_query(query)
+
+        if mode == "hybrid":
+            ranked = hybrid_search(query, query_embedding, db, ids=ids, metadata_filter=metadata_filter)
+        else:
+            ranked = get_vector_store().query(
+                vector=query_embedding,
+                top_k=depth,
+                include_metadata=True,
+                ids=ids,
+                metadata_filter=metadata_filter
+            )["matches"]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Query Pinecone for all relevant users (no limit)
-        search_results = index.query(
-            vector=query_embedding,
-            top_k=10000,  # Set a very high number to return all matches
-            include_metadata=True
-        )
+    matches = ranked[offset:]
+    if min_score is not None:
+        matches = [match for match in matches if match["score"] >= min_score]
+    page = matches[:limit]
 
-        if not search_results["matches"]:
-            raise HTTPException(status_code=404, detail="No matching users found.")
+    next_cursor = None
+    if len(matches) > limit:
+        next_cursor = encode_cursor({"offset": offset + limit})
 
-        # Format response
-        all_matches = [
-            {
-                "user_id": match["id"],
-                "email": match["metadata"]["email"],
-                "name": match["metadata"]["name"],
-                "score": round(match["score"], 4),
-            }
-            for match in search_results["matches"]
-        ]
+    if format == "ndjson":
+        def stream_matches():
+            for match in page:
+                yield json.dumps(format_match(match)) + "\n"
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return StreamingResponse(stream_matches(), media_type="application/x-ndjson", headers=headers)
 
-        return {"query": query, "matches": all_matches}
+    if not page and offset == 0:
+        raise HTTPException(status_code=404, detail="No matching users found.")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Format response
+    return {
+        "query": query,
+        "matches": [format_match(match) for match in page],
+        "next_cursor": next_cursor
+    }
+
+
+def evaluate_skill_filter(expr: str, db: Session):
+    skill_index.sync(db)
+    try:
+        return skill_index.evaluate(expr)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid skill expression: {e}")
+
+
+@router.get("/skill-search")
+def skill_search(
+    expr: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Find candidates by a boolean skill / language expression.
+
+    e.g. `python AND fastapi AND NOT php`, `(react OR vue) AND language:english`.
+    Terms are skill names unless prefixed with `language:`; adjacent words
+    form one name and AND / OR / NOT / parentheses combine them. The
+    expression is evaluated over in-memory compressed bitmaps, so `count` is
+    exact and only the returned page is read from the database.
+    """
+    offset = 0
+    if cursor:
+        try:
+            offset = int(decode_cursor(cursor)["offset"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    matching = evaluate_skill_filter(expr, db)
+    page_ids = list(matching[offset:offset + limit])
 
+    users = {
+        user_id: {"user_id": user_id, "email": email, "name": name}
+        for user_id, email, name in db.query(User.id, User.email, User.name).filter(User.id.in_(page_ids))
+    } if page_ids else {}
+
+    return {
+        "expr": expr,
+        "count": len(matching),
+        "users": [users[user_id] for user_id in page_ids if user_id in users],
+        "next_cursor": encode_cursor({"offset": offset + limit}) if offset + limit < len(matching) else None,
+    }
+
+
+@router.post("/import-candidates")
+def import_candidates(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    hr=Depends(get_current_hr),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import candidates from a partner export (JSONL or CSV of UserModel records).
+
+    The upload is parsed as a stream and inserted in batches; bios are
+    queued for the embedding workers. Returns counts and per-row errors.
+    """
+    fmt = format or detect_format(file.filename)
+    if fmt not in READERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return import_users(stream, db, fmt=fmt)
+    finally:
+        stream.detach()  # leave closing the upload to FastAPI
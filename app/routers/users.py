@@ -1,12 +1,11 @@
 
-from fastapi import APIRouter,HTTPException ,Depends,status,Response,File,UploadFile,BackgroundTasks
+from fastapi import APIRouter,HTTPException ,Depends,status,Response,File,UploadFile,BackgroundTasks,Query,WebSocket,WebSocketDisconnect
+import json
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.oauth2 import get_current_user  
-import os
-import uuid
-import tempfile
 from typing import List, Dict, Any, Optional
 import logging
 
@@ -14,29 +13,37 @@ import logging
 
 from app import models, schemas, oauth2
 from app.database import get_db
-from app.ranking_system import calculate_similarity, get_user_profile_text, get_job_description_text
+from app.ranking_system import calculate_similarity, get_user_profile_text
 
 
-from app.models import User, Skill, Language, WorkExperience, Project, Certification
+from app.models import User
 from app.schemas import UserModel, UserResponseModel,InterviewSettings, QuestionAnswer, QuestionAnswerPairs
 from .. import schemas
 from ..oauth2 import create_access_token
 from app.schemas import WorkExperienceModel, ProjectModel, CertificationModel
 
-from app.job_recommendation import get_user_profile, get_all_jobs, compute_similarity
+from app.profiles import load_user_profile, resolve_skills, resolve_languages, build_user
+from app.job_recommendation import get_user_profile, compute_similarity, is_profile_complete, JobIndexNotReady
+from app.recommendation_builder import get_materialized_recommendations, refresh_user_recommendations
+from app.embedding_queue import EmbeddingWorker, enqueue_embedding, get_embedding_status
+from app.lexical_index import profile_index
+from app.skill_bitmap import skill_index
 
-from pinecone import Pinecone
-import numpy as np
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.services import get_embeddings, get_vector_store, get_transcription_service
+from app.transcription import TranscriptionQueueFull, TranscriptionTimeout
+from app.audio import decode_upload, AudioTooLarge, AudioDecodeError, SAMPLE_RATE, STREAM_FORMATS
+from app.streaming import TranscriptionStream
+from app.vad import transcribe_speech, trim_silence
+import asyncio
+import time
+from app.config import settings as app_settings
 
 
 
 
 
-import whisper
-from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from app.llm import get_llm, invoke_prompt
 
 
 
@@ -46,32 +53,8 @@ logger = logging.getLogger(__name__)
 
 
 
-#setting up vector db
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-
-# Ensure API key is not None
-if not PINECONE_API_KEY:
-    raise ValueError("PINECONE_API_KEY is not set!")
-
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY is not set!")
-
-
-# Initialize Pinecone client
-pc = Pinecone(api_key=PINECONE_API_KEY)
-# Name of your Pinecone index
-INDEX_NAME = "candidate-search"
-index = pc.Index(name=INDEX_NAME)
-
-# Check if the index exists; if not, create it
-if INDEX_NAME not in [index_info.name for index_info in pc.list_indexes()]:  
-    pc.create_index(name=INDEX_NAME, dimension=768, metric="cosine")
-
-
-# Initialize Google Generative AI Embeddings
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GEMINI_API_KEY)
-print(f"Successfully connected to Pinecone index: {INDEX_NAME}")
+# Background worker for queued bio embeddings, started in app.main
+embedding_worker = EmbeddingWorker(get_embeddings, get_vector_store)
 
 
 router = APIRouter(
@@ -80,7 +63,7 @@ router = APIRouter(
 
 # -------------------------- user regristration ------------------------------------------------
 @router.post("/register",status_code=status.HTTP_201_CREATED)
-def register_user(user: UserModel, db: Session = Depends(get_db)):
+def register_user(user: UserModel, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     
     # Check if user already exists
     """
@@ -100,93 +83,46 @@ def register_user(user: UserModel, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Email already registered")
         # hash_password = hash(user.password)
         # user.password = hash_password
-        # Create new user
-        new_user = User(
-            email=user.email,
-            name=user.name,
-            password=user.password,  
-            location=user.location,
-            bio=user.bio
+        # Create new user together with its whole profile graph, so it is
+        # written in a single transaction. Skills and languages: one bulk
+        # upsert and one IN lookup each
+        skills = resolve_skills(db, user.skills)
+        languages = resolve_languages(db, user.languages)
+        new_user = build_user(
+            user,
+            {skill.skill_name: skill for skill in skills},
+            {language.language_name: language for language in languages}
         )
-        # Generate vector embedding of the bio
-        bio_embedding = embeddings.embed_documents([user.bio])[0]  # Get the first embedding
-
-
         db.add(new_user)
+        # Bio embedding and the vector upsert happen in the embedding worker
+        enqueue_embedding(db, new_user)
         db.commit()
-        db.refresh(new_user)
-
-        # Store in Pinecone
-        index.upsert([
-        (str(new_user.id), bio_embedding, { "email": new_user.email, "name": new_user.name})
-        ])
-
-        # Add skills
-        for skill in user.skills:
-            skill_entry = db.query(Skill).filter(Skill.skill_name == skill).first()
-            if not skill_entry:
-                skill_entry = Skill(skill_name=skill)
-                db.add(skill_entry)
-                db.commit()
-            new_user.skills.append(skill_entry)
-
-        # Add languages
-        for lang in user.languages:
-            language_entry = db.query(Language).filter(Language.language_name == lang).first()
-            if not language_entry:
-                language_entry = Language(language_name=lang)
-                db.add(language_entry)
-                db.commit()
-            new_user.languages.append(language_entry)
-
-        # Add experiences
-        for exp in user.experiences:
-            experience = WorkExperience(
-                user_id=new_user.id,
-                company=exp.company,
-                position=exp.position,
-                location=exp.location,
-                start_date=exp.start_date,
-                end_date=exp.end_date,
-                currently_working=exp.currently_working,
-                description=exp.description
-            )
-            db.add(experience)
-
-        # Add projects
-        for proj in user.projects:
-            project = Project(
-                user_id=new_user.id,
-                project_name=proj.project_name,
-                project_description=proj.project_description,
-                project_link=proj.project_link
-            )
-            db.add(project)
-
-        # Add certifications
-        for cert in user.certifications:
-            certification = Certification(
-                user_id=new_user.id,
-                certification_name=cert.certification_name,
-                certification_provider=cert.certification_provider,
-                certificate_link=cert.certificate_link
-            )
-            db.add(certification)
-
-        db.commit()
+        embedding_worker.notify()
 
-        print(new_user)
-        print(user)
-        skills=[skill.skill_name for skill in new_user.skills]
-        languages=[language.language_name for language in new_user.languages]
-        print(languages)
-        print(skills)
+        # Materialize the new user's job matches off the request path
+        background_tasks.add_task(refresh_user_recommendations, new_user.id)
+        # Make the profile searchable by keyword in hybrid /hr/search
+        background_tasks.add_task(profile_index.refresh_user, new_user.id)
+        background_tasks.add_task(skill_index.refresh_user, new_user.id)
 
         return {"message": "User registered successfully"}, status.HTTP_201_CREATED
 
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+#------------------------ embedding status -----------------------------------
+
+@router.get("/embedding-status")
+def embedding_status(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    - Shows whether the user's bio has been embedded for candidate search yet.
+    """
+    job_status = get_embedding_status(db, current_user.id)
+    if not job_status:
+        raise HTTPException(status_code=404, detail="No embedding queued for this user")
+    return job_status
+
 #------------------------ Login -----------------------------------
 
 @router.get("/login")
@@ -231,7 +167,7 @@ def view_user_profile(
     """
     - Allows a logged-in user to view their own profile.
     """
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = load_user_profile(db, current_user.id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -253,7 +189,30 @@ def view_user_profile(
 
 
 @router.get("/jobs")
-def recommend_jobs(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def recommend_jobs(
+    background_tasks: BackgroundTasks,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    location: Optional[str] = None,
+    work_type: Optional[str] = None,
+    job_type: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    filters = {"location": location, "work_type": work_type, "job_type": job_type}
+
+    # Unfiltered pages are served straight from the materialized table
+    if not any(filters.values()):
+        materialized = get_materialized_recommendations(db, user.id, limit, offset)
+        if materialized:
+            recommended_jobs, total = materialized
+            return {
+                "recommended_jobs": recommended_jobs,
+                "total": total,
+                "limit": limit,
+                "offset": offset
+            }
+
     user_profile = get_user_profile(user.id, db)
     
     # Ensure user profile exists
@@ -261,18 +220,31 @@ def recommend_jobs(user: User = Depends(get_current_user), db: Session = Depends
         return JSONResponse(status_code=404, content={"message": "User profile not found"})
 
     # Ensure user profile has required fields
-    if not any([user_profile.get("skills"), user_profile.get("experience"), user_profile.get("projects")]):
+    if not is_profile_complete(user_profile):
         return JSONResponse(status_code=400, content={"message": "User profile is incomplete for recommendations"})
 
-    jobs = get_all_jobs(db)
+    try:
+        # Structured filters are resolved through the job index before scoring
+        recommended_jobs, total = compute_similarity(
+            user_profile, db, limit=limit, offset=offset, filters=filters
+        )
 
-    # Ensure job list is not empty
-    if not jobs:
-        return JSONResponse(status_code=404, content={"message": "No job postings found"})
+        # Ensure job list is not empty
+        if not total:
+            return JSONResponse(status_code=404, content={"message": "No job postings found"})
 
-    try:
-        recommended_jobs = compute_similarity(user_profile, jobs)
-        return {"recommended_jobs": recommended_jobs}  # Return top 10 jobs
+        # Nothing materialized for this user yet, build it for the next visit
+        if not any(filters.values()) and offset == 0:
+            background_tasks.add_task(refresh_user_recommendations, user.id)
+
+        return {
+            "recommended_jobs": recommended_jobs,  # Top `limit` jobs after `offset`
+            "total": total,
+            "limit": limit,
+            "offset": offset
+        }
+    except JobIndexNotReady as e:
+        return JSONResponse(status_code=503, content={"message": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": "Error computing recommendations", "error": str(e)})
 
@@ -303,12 +275,11 @@ def apply_for_job(job_id: int, user=Depends(oauth2.get_current_user), db: Sessio
     if existing_application:
         raise HTTPException(status_code=400, detail="Already applied for this job")
 
-    # Generate profile and job description text
-    user_text = get_user_profile_text(user, db)
-    job_text = get_job_description_text(job)
+    # Generate profile text
+    user_text = get_user_profile_text(load_user_profile(db, user.id), db)
 
-    # Compute similarity score
-    similarity_score = float(calculate_similarity(user_text, job_text))  
+    # Compute similarity score against the shared scoring model
+    similarity_score = calculate_similarity(user_text, job, db)
 
 
     # Create new application with ranking score
@@ -330,33 +301,8 @@ def apply_for_job(job_id: int, user=Depends(oauth2.get_current_user), db: Sessio
 
 
 #----- AI mock interview
-# Get API credentials
-API_KEY = os.environ.get("API_KEY")
-BASE_URL = os.environ.get("BASE_URL")
-
-if not API_KEY:
-    logger.warning("OPENAI_API_KEY environment variable not set!")
-
-# Load Whisper model
-try:
-    model = whisper.load_model("medium")
-    logger.info("Whisper medium model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading Whisper model: {e}")
-    model = None
-
-# Initialize OpenAI model for LangChain
-def get_llm():
-    try:
-        return ChatOpenAI(
-            model="gpt-4o",
-            api_key=API_KEY,
-            base_url=BASE_URL,
-            temperature=0.3
-        )
-    except Exception as e:
-        logger.error(f"Error initializing ChatOpenAI: {e}")
-        return None
+# The chat model is one shared, pooled client (app.llm); get_llm() returns
+# None when it is unavailable and the endpoints fall back to canned answers
 
 # Question generation prompt template
 QUESTION_PROMPT_TEMPLATE = """
@@ -420,7 +366,7 @@ async def mock_interview_endpoint(settings: InterviewSettings = None, audio: Upl
 # Helper function to generate questions
 async def generate_questions(settings: InterviewSettings):
     try:
-        llm = get_llm()
+        llm = await get_llm()
         if not llm:
             # Fallback questions based on topic if OpenAI not available
             topic = settings.topic.lower()
@@ -475,9 +421,8 @@ async def generate_questions(settings: InterviewSettings):
             template=QUESTION_PROMPT_TEMPLATE
         )
         
-        chain = LLMChain(llm=llm, prompt=prompt)
-        
-        result = chain.run({
+        # Async call on the shared client, bounded by llm_timeout / llm_max_concurrency
+        result = await invoke_prompt(llm, prompt, {
             "topic": settings.topic,
             "difficulty": settings.difficulty,
             "question_count": settings.questionCount
@@ -508,6 +453,9 @@ async def generate_questions(settings: InterviewSettings):
         
         return {"questions": questions}
         
+    except asyncio.TimeoutError:
+        logger.error("Timed out generating questions")
+        raise HTTPException(status_code=504, detail="Question generation timed out")
     except Exception as e:
         logger.error(f"Error generating questions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -515,41 +463,52 @@ async def generate_questions(settings: InterviewSettings):
 # Helper function to transcribe audio
 async def transcribe_audio(audio: UploadFile = File(...)):
     try:
-        if not model:
+        # Whisper runs in its own process pool, started on first use (or by
+        # the startup warm-up) without blocking the event loop
+        try:
+            transcriber = await run_in_threadpool(get_transcription_service)
+        except Exception:
             raise HTTPException(status_code=500, detail="Whisper model not loaded")
         
-        # Save uploaded file temporarily
-        temp_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_dir, f"{uuid.uuid4()}.webm")
-        
-        with open(temp_file_path, "wb") as buffer:
-            content = await audio.read()
-            buffer.write(content)
-        
+        # Decode the upload in chunks straight to 16 kHz PCM, no temp file
         try:
-            # Transcribe the audio file
-            logger.info(f"Starting transcription of file: {temp_file_path}")
-            result = model.transcribe(temp_file_path)
-            transcription = result["text"].strip()
-            logger.info(f"Transcription completed successfully, length: {len(transcription)}")
+            audio_array = await decode_upload(audio)
+        except AudioTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        try:
+            # Transcribe the decoded audio
+            logger.info(f"Starting transcription of {len(audio_array) / SAMPLE_RATE:.1f}s of audio")
+            # Re-submitted recordings are answered from the transcription cache
+            if app_settings.vad_enabled:
+                # Only the speech goes to Whisper, long thinking pauses are cut out
+                result = await transcribe_speech(transcriber, audio_array, cached=True)
+            else:
+                result = await transcriber.transcribe(audio_array, cached=True)
+            transcription = result["text"]
+            logger.info(
+                f"Transcription completed successfully, length: {len(transcription)}, "
+                f"speech: {result.get('speech_seconds', len(audio_array) / SAMPLE_RATE):.1f}s, "
+                f"inference: {result['inference_seconds']:.1f}s{' (cached)' if result.get('cached') else ''}"
+            )
+        except TranscriptionQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except TranscriptionTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
         except Exception as e:
             logger.error(f"Error during transcription: {e}")
             raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
-        finally:
-            # Clean up the temporary file
-            try:
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                if os.path.exists(temp_dir):
-                    os.rmdir(temp_dir)
-            except Exception as e:
-                logger.error(f"Error cleaning up temp files: {e}")
 
         if not transcription:
             return {"transcription": "The audio couldn't be transcribed clearly. Please try speaking more clearly or check your microphone."}
             
         return {"transcription": transcription}
-        
+
+    except HTTPException as e:
+        if e.status_code in (413, 503, 504):
+            raise
+        logger.error(f"Error transcribing audio: {e.detail}")
+        return {"transcription": f"Sorry, there was an error transcribing your audio: {e.detail}. Please try again."}
     except Exception as e:
         logger.error(f"Error transcribing audio: {e}")
         return {"transcription": f"Sorry, there was an error transcribing your audio: {str(e)}. Please try again."}
@@ -558,7 +517,7 @@ async def transcribe_audio(audio: UploadFile = File(...)):
 @router.post("/mock-interview/evaluate")
 async def evaluate_answer(question_answer: QuestionAnswer):
     try:
-        llm = get_llm()
+        llm = await get_llm()
         if not llm:
             return {
                 "score": 7,
@@ -570,9 +529,8 @@ async def evaluate_answer(question_answer: QuestionAnswer):
             template=ANSWER_EVALUATION_TEMPLATE
         )
         
-        chain = LLMChain(llm=llm, prompt=prompt)
-        
-        result = chain.run({
+        # Async call on the shared client, bounded by llm_timeout / llm_max_concurrency
+        result = await invoke_prompt(llm, prompt, {
             "question": question_answer.question,
             "answer": question_answer.answer
         })
@@ -600,7 +558,7 @@ async def evaluate_answer(question_answer: QuestionAnswer):
 @router.post("/mock-interview/report")
 async def generate_report(qa_pairs: QuestionAnswerPairs):
     try:
-        llm = get_llm()
+        llm = await get_llm()
         if not llm:
             # Generate a fallback report
             feedbacks = []
@@ -632,9 +590,8 @@ async def generate_report(qa_pairs: QuestionAnswerPairs):
             template=REPORT_TEMPLATE
         )
         
-        chain = LLMChain(llm=llm, prompt=prompt)
-        
-        result = chain.run({
+        # Async call on the shared client, bounded by llm_timeout / llm_max_concurrency
+        result = await invoke_prompt(llm, prompt, {
             "qa_pairs": formatted_qa
         })
         
@@ -677,3 +634,136 @@ async def questions_endpoint(settings: InterviewSettings):
 @router.post("/mock-interview/transcribe")
 async def transcribe_endpoint(audio: UploadFile = File(...)):
     return await transcribe_audio(audio)
+
+
+# Most clips accepted by one batch transcription request
+MAX_BATCH_CLIPS = 20
+
+
+async def decode_clip(audio: UploadFile):
+    started = time.perf_counter()
+    audio_array = await decode_upload(audio)
+    audio_seconds = len(audio_array) / SAMPLE_RATE
+    if app_settings.vad_enabled:
+        audio_array, _ = await asyncio.to_thread(trim_silence, audio_array)
+    return audio_array, audio_seconds, time.perf_counter() - started
+
+
+@router.post("/mock-interview/transcribe-batch")
+async def transcribe_batch_endpoint(audio: List[UploadFile] = File(...)):
+    """
+    Transcribe all answer clips of a session in one request.
+
+    Clips are decoded (and silence-trimmed) concurrently, then transcribed
+    as one pool job: clips up to 30 s are padded and decoded together in
+    batches. Returns a transcript and timings per clip, in upload order.
+    """
+    if len(audio) > MAX_BATCH_CLIPS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CLIPS} clips per request")
+
+    started = time.perf_counter()
+    try:
+        transcriber = await run_in_threadpool(get_transcription_service)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Whisper model not loaded")
+
+    decoded = await asyncio.gather(*(decode_clip(clip) for clip in audio), return_exceptions=True)
+    for clip, result in zip(audio, decoded):
+        if isinstance(result, AudioTooLarge):
+            raise HTTPException(status_code=413, detail=f"{clip.filename}: {result}")
+
+    # clips that failed to decode or are silent are reported without a model call
+    to_transcribe = [
+        i for i, result in enumerate(decoded)
+        if not isinstance(result, Exception) and len(result[0])
+    ]
+    try:
+        transcribed = await transcriber.transcribe_batch(
+            [decoded[i][0] for i in to_transcribe], cached=True
+        )
+    except TranscriptionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except TranscriptionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error during batch transcription: {e}")
+        raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
+    results = dict(zip(to_transcribe, transcribed))
+
+    clips = []
+    for i, (clip, result) in enumerate(zip(audio, decoded)):
+        if isinstance(result, Exception):
+            clips.append({"filename": clip.filename, "error": str(result)})
+            continue
+        speech, audio_seconds, decode_seconds = result
+        transcript = results.get(i, {})
+        clips.append({
+            "filename": clip.filename,
+            "transcription": transcript.get("text", ""),
+            "audio_seconds": round(audio_seconds, 2),
+            "speech_seconds": round(len(speech) / SAMPLE_RATE, 2),
+            "decode_seconds": round(decode_seconds, 3),
+            "inference_seconds": round(transcript.get("inference_seconds", 0.0), 3),
+            "batched": transcript.get("batched", False),
+            "cached": transcript.get("cached", False),
+        })
+
+    total_seconds = time.perf_counter() - started
+    logger.info(f"Batch transcription of {len(audio)} clips completed in {total_seconds:.1f}s")
+    return {"clips": clips, "total_seconds": round(total_seconds, 3)}
+
+
+# Streaming transcription: partial / final segments while the candidate speaks
+@router.websocket("/mock-interview/stream")
+async def stream_transcription(websocket: WebSocket, format: str = "pcm"):
+    """
+    Send audio as binary frames, then the text frame `{"type": "end"}`.
+
+    `format=pcm`: 16 kHz mono signed 16-bit little-endian frames.
+    `format=encoded`: MediaRecorder chunks (WebM/Opus, Ogg, ...), decoded by ffmpeg.
+    Replies are JSON `partial`, `final` and finally `done` messages (see app.streaming);
+    errors are sent as `{"type": "error", "detail"}` before closing.
+    """
+    await websocket.accept()
+    if format not in STREAM_FORMATS:
+        await websocket.send_json({"type": "error", "detail": f"Unsupported format: {format}"})
+        await websocket.close(code=1003)
+        return
+
+    try:
+        transcriber = await run_in_threadpool(get_transcription_service)
+    except Exception:
+        await websocket.send_json({"type": "error", "detail": "Whisper model not loaded"})
+        await websocket.close(code=1011)
+        return
+
+    decoder = STREAM_FORMATS[format]()
+    stream = TranscriptionStream(transcriber, websocket.send_json, app_settings.max_audio_seconds)
+    try:
+        await decoder.start()
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await decoder.write(message["bytes"])
+                stream.add_audio(decoder.read_available())
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        stream.add_audio(await decoder.close())
+        text = await stream.finish()
+        logger.info(f"Streaming transcription completed, length: {len(text)}")
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Streaming transcription client disconnected")
+    except (AudioTooLarge, AudioDecodeError, TranscriptionQueueFull, TranscriptionTimeout) as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008 if isinstance(e, AudioTooLarge) else 1011)
+    except Exception as e:
+        logger.error(f"Error in streaming transcription: {e}")
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+    finally:
+        stream.cancel()
+        decoder.kill()
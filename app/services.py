@@ -0,0 +1,162 @@
+"""
+Lazily created heavy models and external clients.
+
+The Whisper transcription pool, the vector store (Pinecone by default), the
+Gemini embeddings client and the OpenAI chat model are each built once per
+process, on first use, instead of at import time. Importing the routers
+therefore costs no model load and no network round trip; a worker boots in
+well under a second and still starts when Pinecone or Gemini are
+unreachable.
+
+``warm_up()`` builds some or all of them ahead of the first request;
+``app.main`` calls it on startup for the services listed in
+``settings.warm_up_services``.
+"""
+import logging
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """A process-wide singleton created by ``factory`` on the first ``get()``."""
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.last_error = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                # another thread may have finished loading while we waited
+                if self._instance is None:
+                    started = time.perf_counter()
+                    try:
+                        self._instance = self.factory()
+                    except Exception as e:
+                        # not cached, the next caller tries again
+                        self.last_error = str(e)
+                        logger.error(f"Error loading {self.name}: {e}")
+                        raise
+                    self.load_seconds = time.perf_counter() - started
+                    self.last_error = None
+                    logger.info(f"{self.name} loaded in {self.load_seconds:.2f}s")
+        return self._instance
+
+    def status(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+def _create_transcription_service():
+    from app.cache import DiskCache
+    from app.transcription import TranscriptionService
+
+    service = TranscriptionService(
+        model_name=settings.whisper_model,
+        fallback_model=settings.whisper_fallback_model or None,
+        latency_budget=settings.whisper_latency_budget,
+        device=settings.whisper_device or None,
+        threads=settings.whisper_threads,
+        fp16=settings.whisper_fp16,
+        int8=settings.whisper_int8,
+        workers=settings.transcription_workers,
+        queue_size=settings.transcription_queue_size,
+        timeout=settings.transcription_timeout,
+        cache=DiskCache(settings.transcription_cache_path, settings.transcription_cache_max_bytes),
+    )
+    service.start()
+    return service
+
+
+def _create_embeddings():
+    from app.embeddings import create_embeddings
+
+    return create_embeddings()
+
+
+def _create_vector_store():
+    from app.vector_store import create_vector_store
+
+    return create_vector_store()
+
+
+def _create_llm():
+    from app.llm import create_llm
+
+    return create_llm()
+
+
+services = {
+    "transcription": LazyService("transcription", _create_transcription_service),
+    "embeddings": LazyService("embeddings", _create_embeddings),
+    "vector_store": LazyService("vector_store", _create_vector_store),
+    "llm": LazyService("llm", _create_llm),
+}
+
+
+def get_transcription_service():
+    return services["transcription"].get()
+
+
+def get_embeddings():
+    return services["embeddings"].get()
+
+
+def get_vector_store():
+    return services["vector_store"].get()
+
+
+def warm_up(names=None) -> dict:
+    """
+    Load the given services (all of them by default) now.
+
+    Failures are logged and reported, not raised, so a missing model or an
+    unreachable API does not stop the app from starting.
+    """
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(",") if name.strip()]
+    for name in names if names is not None else services:
+        if name not in services:
+            logger.warning(f"Unknown service in warm-up list: {name}")
+            continue
+        try:
+            services[name].get()
+        except Exception:
+            pass
+    return service_status()
+
+
+def service_status() -> dict:
+    return {name: service.status() for name, service in services.items()}
+
+
+def shutdown():
+    transcription = services["transcription"]
+    if transcription.loaded:
+        transcription.get().shutdown()
+
+
+def warm_up_in_background():
+    """Warm up ``settings.warm_up_services`` without blocking startup."""
+    if not settings.warm_up_services:
+        return None
+    thread = threading.Thread(
+        target=warm_up, args=(settings.warm_up_services,), name="service-warm-up", daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,268 @@
+"""
+Boolean skill / language filters over compressed (Roaring) bitmaps.
+
+Every ``Skill`` and ``Language`` row gets one bitmap of the user ids that
+have it, so an expression such as
+
+    python AND fastapi AND NOT php
+    (react OR vue) AND language:english
+
+is evaluated as bitmap AND / OR / NOT without touching the database.
+Terms are matched case-insensitively; consecutive words form one term
+("machine learning"), quotes work too. ``language:`` (or ``lang:``)
+selects a language, ``skill:`` is the default.
+
+The same expression can also be compiled to a Pinecone metadata filter over
+the ``skill_ids`` / ``language_ids`` the embedding worker stores with every
+vector, so a large filtered set is searched by the index itself.
+"""
+import logging
+import re
+import threading
+
+from pyroaring import BitMap
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.index_sync import IdWatermark
+from app.models import User, Skill, Language, user_skills, user_languages
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+OPERATORS = {"AND", "OR", "NOT"}
+LOAD_BATCH_SIZE = 10000     # users per membership query
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def tokenize(expression: str):
+    """Split into "(", ")", operators and terms; adjacent words merge into one term."""
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Unexpected character at {position}: {expression[position]!r}")
+        position = match.end()
+        open_paren, close_paren, quoted, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append(open_paren or close_paren)
+        elif word and word.upper() in OPERATORS:
+            tokens.append(word.upper())
+        else:
+            term = quoted if quoted is not None else word
+            if tokens and isinstance(tokens[-1], tuple):
+                tokens[-1] = ("TERM", f"{tokens[-1][1]} {term}")
+            else:
+                tokens.append(("TERM", term))
+    return tokens
+
+
+class SkillBitmapIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.skills = {}        # normalized skill name -> BitMap of user ids
+        self.languages = {}     # normalized language name -> BitMap of user ids
+        self.skill_ids = {}     # normalized skill name -> Skill ids with that name
+        self.language_ids = {}  # normalized language name -> Language ids with that name
+        self.universe = BitMap()
+        self.watermark = IdWatermark(User.id)
+
+    def _add(self, bitmaps: dict, name_ids: dict, rows):
+        for user_id, row_id, name in rows:
+            name = normalize_name(name)
+            bitmaps.setdefault(name, BitMap()).add(user_id)
+            name_ids.setdefault(name, set()).add(row_id)
+
+    def _memberships(self, db: Session, user_ids):
+        skill_rows = (
+            db.query(user_skills.c.user_id, Skill.id, Skill.skill_name)
+            .join(Skill, Skill.id == user_skills.c.skill_id)
+            .filter(user_skills.c.user_id.in_(user_ids))
+            .all()
+        )
+        language_rows = (
+            db.query(user_languages.c.user_id, Language.id, Language.language_name)
+            .join(Language, Language.id == user_languages.c.language_id)
+            .filter(user_languages.c.user_id.in_(user_ids))
+            .all()
+        )
+        return skill_rows, language_rows
+
+    def sync(self, db: Session):
+        """
+        Load memberships of users we have not seen yet.
+
+        One query per table for each batch of users; afterwards only users
+        committed since are read (see ``IdWatermark``), so registrations from
+        other workers and bulk imports are picked up incrementally.
+        """
+        with self.watermark.lock:
+            user_ids = self.watermark.pending_ids(db)
+            for start in range(0, len(user_ids), LOAD_BATCH_SIZE):
+                batch = user_ids[start:start + LOAD_BATCH_SIZE]
+                skill_rows, language_rows = self._memberships(db, batch)
+                with self._lock:
+                    self.universe.update(batch)
+                    self._add(self.skills, self.skill_ids, skill_rows)
+                    self._add(self.languages, self.language_ids, language_rows)
+                self.watermark.mark_loaded(batch)
+            self.watermark.loaded = True
+
+    def refresh_users(self, user_ids):
+        """Re-index users' skills and languages after a change or an import (background task)."""
+        if not self.watermark.loaded:
+            return  # the first sync() loads them anyway
+        db = SessionLocal()
+        try:
+            skill_rows, language_rows = self._memberships(db, user_ids)
+            existing = [user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))]
+            stale = BitMap(user_ids)
+            with self._lock:
+                for bitmap in list(self.skills.values()) + list(self.languages.values()):
+                    bitmap.difference_update(stale)
+                self.universe.difference_update(stale)
+                self.universe.update(existing)
+                self._add(self.skills, self.skill_ids, skill_rows)
+                self._add(self.languages, self.language_ids, language_rows)
+        except Exception as e:
+            logger.error(f"Error indexing skills of users {user_ids[:10]}: {e}")
+        finally:
+            db.close()
+
+    def refresh_user(self, user_id: int):
+        self.refresh_users([user_id])
+
+    # ---- expression evaluation ----
+
+    def _kind(self, term: str):
+        """``("skill" | "language", normalized name)`` of a term."""
+        prefix, _, name = term.partition(":")
+        if name and prefix.lower() in ("language", "lang"):
+            return "language", normalize_name(name)
+        if name and prefix.lower() == "skill":
+            return "skill", normalize_name(name)
+        return "skill", normalize_name(term)
+
+    def _term(self, term: str) -> BitMap:
+        """A copy of the term's bitmap; callers hold ``_lock``, ``refresh_users`` mutates the stored one."""
+        kind, name = self._kind(term)
+        bitmaps = self.languages if kind == "language" else self.skills
+        return BitMap(bitmaps.get(name, ()))
+
+    def evaluate(self, expression: str) -> BitMap:
+        """Evaluate a boolean expression to the bitmap of matching user ids."""
+        tree = parse(expression)
+
+        def walk(node):
+            if node[0] == "TERM":
+                return self._term(node[1])
+            if node[0] == "NOT":
+                return self.universe - walk(node[1])
+            left, right = walk(node[1]), walk(node[2])
+            return left & right if node[0] == "AND" else left | right
+
+        with self._lock:
+            return walk(tree)
+
+    def metadata_filter(self, expression: str):
+        """
+        The expression as a Pinecone metadata filter, or None when it reduces
+        to "everyone" or "no one" (a term no user has), which a filter cannot
+        say; the caller then relies on the evaluated id set.
+        """
+        tree = parse(expression)
+
+        def walk(node, negate):
+            # NOT is pushed down to the terms (De Morgan): $in becomes $nin
+            if node[0] == "TERM":
+                kind, name = self._kind(node[1])
+                name_ids = self.language_ids if kind == "language" else self.skill_ids
+                ids = sorted(str(row_id) for row_id in name_ids.get(name, ()))
+                if not ids:
+                    return negate
+                return {f"{kind}_ids": {"$nin" if negate else "$in": ids}}
+            if node[0] == "NOT":
+                return walk(node[1], not negate)
+            operator = node[0] if not negate else ("OR" if node[0] == "AND" else "AND")
+            neutral = operator == "AND"     # True for AND, False for OR
+            parts = []
+            for child in (walk(node[1], negate), walk(node[2], negate)):
+                if child is neutral:
+                    continue
+                if child is (not neutral):
+                    return child
+                parts.append(child)
+            if not parts:
+                return neutral
+            return parts[0] if len(parts) == 1 else {f"${operator.lower()}": parts}
+
+        with self._lock:
+            result = walk(tree, False)
+        return result if isinstance(result, dict) else None
+
+
+def parse(expression: str):
+    """
+    Parse an expression to a tree of ``("TERM", name)``, ``("NOT", node)``,
+    ``("AND", left, right)`` and ``("OR", left, right)``.
+    """
+    tokens = tokenize(expression)
+    if not tokens:
+        raise ValueError("Empty expression")
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        result = parse_and()
+        while peek() == "OR":
+            take()
+            result = ("OR", result, parse_and())
+        return result
+
+    def parse_and():
+        result = parse_not()
+        while peek() == "AND":
+            take()
+            result = ("AND", result, parse_not())
+        return result
+
+    def parse_not():
+        if peek() == "NOT":
+            take()
+            return ("NOT", parse_not())
+        return parse_atom()
+
+    def parse_atom():
+        token = peek()
+        if token is None:
+            raise ValueError("Unexpected end of expression")
+        take()
+        if token == "(":
+            result = parse_or()
+            if peek() != ")":
+                raise ValueError("Missing closing parenthesis")
+            take()
+            return result
+        if isinstance(token, tuple):
+            return token
+        raise ValueError(f"Unexpected {token!r}")
+
+    tree = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[position]!r}")
+    return tree
+
+
+skill_index = SkillBitmapIndex()
@@ -0,0 +1,134 @@
+"""
+Windowed, incremental transcription of a live interview answer.
+
+Audio is appended as it arrives. Once ``STEP_SECONDS`` of new audio is in
+and no pass is running, the uncommitted window (at most Whisper's 30 s) is
+transcribed in the pool and sent back as a ``partial``. When the window has
+grown past ``COMMIT_SECONDS``, every segment but the last is committed: it
+is sent as ``final``, its audio is dropped from the buffer and its text
+becomes the prompt for the next window. So by the time the candidate
+stops, only the last few seconds are left for the closing pass.
+
+Messages sent:
+    {"type": "partial", "text", "start"}
+    {"type": "final", "text", "start", "end"}      (seconds from stream start)
+    {"type": "done", "text"}                       (all final text)
+"""
+import asyncio
+import logging
+
+import numpy as np
+
+from app.audio import SAMPLE_RATE, AudioTooLarge
+from app.transcription import TranscriptionQueueFull
+
+logger = logging.getLogger(__name__)
+
+STEP_SECONDS = 1.0          # new audio needed before another partial pass
+COMMIT_SECONDS = 10.0       # window length from which leading segments are committed
+MAX_WINDOW_SECONDS = 30.0   # Whisper's context
+PROMPT_CHARS = 200          # committed text passed as initial_prompt
+FINAL_RETRIES = 3
+
+
+class TranscriptionStream:
+    def __init__(self, transcriber, send, max_seconds: float):
+        self.transcriber = transcriber
+        self.send = send
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self.buffer = np.zeros(0, dtype=np.float32)   # audio not committed yet
+        self.offset = 0             # samples committed (and dropped) so far
+        self.received = 0
+        self.new_samples = 0        # arrived since the last pass started
+        self.final_segments = []
+        self.task = None
+
+    @property
+    def prompt(self):
+        text = " ".join(segment["text"] for segment in self.final_segments)
+        return text[-PROMPT_CHARS:] or None
+
+    def add_audio(self, samples: np.ndarray):
+        if not len(samples):
+            return
+        self.received += len(samples)
+        if self.received > self.max_samples:
+            raise AudioTooLarge(f"Audio stream is longer than {self.max_samples // SAMPLE_RATE} seconds")
+        self.buffer = np.concatenate([self.buffer, samples])
+        self.new_samples += len(samples)
+
+        if self.new_samples >= STEP_SECONDS * SAMPLE_RATE and (self.task is None or self.task.done()):
+            self.task = asyncio.create_task(self._partial_pass())
+
+    async def _partial_pass(self):
+        try:
+            await self._pass(final=False)
+        except TranscriptionQueueFull:
+            pass  # pool busy, the next step tries again
+        except Exception as e:
+            logger.error(f"Error in streaming transcription pass: {e}")
+
+    async def _pass(self, final: bool):
+        window = self.buffer[:int(MAX_WINDOW_SECONDS * SAMPLE_RATE)]
+        self.new_samples = 0
+        result = await self.transcriber.transcribe(
+            window, condition_on_previous_text=False, initial_prompt=self.prompt
+        )
+        segments = [segment for segment in result["segments"] if segment["text"].strip()]
+        window_seconds = len(window) / SAMPLE_RATE
+
+        if final or (window_seconds >= MAX_WINDOW_SECONDS and not segments):
+            # closing pass, or a full window of silence: take everything
+            committed, cut = segments, len(window)
+        elif window_seconds >= MAX_WINDOW_SECONDS and len(segments) == 1:
+            committed = segments
+            cut = min(len(window), int(segments[0]["end"] * SAMPLE_RATE))
+        elif window_seconds >= COMMIT_SECONDS and len(segments) > 1:
+            committed = segments[:-1]
+            cut = min(len(window), int(committed[-1]["end"] * SAMPLE_RATE))
+        else:
+            committed, cut = [], 0
+
+        start = self.offset / SAMPLE_RATE
+        for segment in committed:
+            final_segment = {
+                "type": "final",
+                "text": segment["text"].strip(),
+                "start": round(start + segment["start"], 2),
+                "end": round(start + segment["end"], 2),
+            }
+            self.final_segments.append(final_segment)
+            await self.send(final_segment)
+
+        if cut:
+            self.buffer = self.buffer[cut:]
+            self.offset += cut
+
+        pending = segments[len(committed):]
+        if pending and not final:
+            await self.send({
+                "type": "partial",
+                "text": " ".join(segment["text"].strip() for segment in pending),
+                "start": round(self.offset / SAMPLE_RATE, 2),
+            })
+
+    async def finish(self) -> str:
+        """Transcribe whatever is left, send it as final and then ``done``."""
+        if self.task is not None:
+            await self.task
+        while len(self.buffer):
+            for attempt in range(FINAL_RETRIES):
+                try:
+                    await self._pass(final=True)
+                    break
+                except TranscriptionQueueFull:
+                    if attempt == FINAL_RETRIES - 1:
+                        raise
+                    await asyncio.sleep(1)
+        text = " ".join(segment["text"] for segment in self.final_segments)
+        await self.send({"type": "done", "text": text})
+        return text
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
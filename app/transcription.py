@@ -0,0 +1,465 @@
+"""
+Whisper transcription in a dedicated process pool.
+
+Inference is CPU/GPU bound and holds the GIL for seconds, so it must not run
+on the event loop (or in the default thread pool). ``TranscriptionService``
+owns a ``ProcessPoolExecutor`` whose workers each load the Whisper model
+once, in their initializer. Requests are admitted up to ``max_pending``
+jobs (running plus queued); beyond that callers get
+``TranscriptionQueueFull`` straight away instead of piling up. Each request
+waits at most ``timeout`` seconds.
+
+A timed-out job that is already running cannot be interrupted inside the
+worker process; it keeps its slot until it finishes, so the admission
+limit stays honest.
+
+When a pool worker dies (typically Whisper being OOM-killed) the executor
+is broken for good: the jobs it had in flight fail, and the first caller to
+notice swaps in a fresh pool so later jobs run again.
+
+With ``cached=True`` results are looked up in a ``DiskCache`` first, keyed
+by model, options and a SHA-256 of the decoded PCM, so a re-submitted
+recording (whatever container it came in) skips inference. Identical
+requests arriving together share one inference.
+
+The model tier is configuration (``settings.whisper_*``): model size,
+device, fp16 on GPU, dynamic int8 quantization and torch threads on CPU.
+With a ``fallback_model`` and a ``latency_budget``, a job whose expected
+latency (queued work plus its own length times the observed real-time
+factor) would exceed the budget runs on the smaller model instead; every
+pool worker keeps both loaded.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "medium"
+SAMPLE_RATE = 16000        # whisper.audio.SAMPLE_RATE
+LATENCY_WINDOW = 200       # recent jobs kept for the percentile stats
+BATCH_SIZE = 8             # clips per whisper.decode call
+BATCH_OPTIONS = {"batch": True}   # cache key options of batch-decoded clips
+
+# set in each pool process by _init_worker
+_models = {}               # model name -> loaded model
+_fp16 = False
+
+
+class TranscriptionQueueFull(Exception):
+    pass
+
+
+class TranscriptionTimeout(Exception):
+    pass
+
+
+def load_whisper_model(name: str, device: str = None, threads: int = 0, int8: bool = False):
+    """Load a Whisper model with the CPU options applied (also used by the benchmarks)."""
+    import torch
+    import whisper
+
+    if threads:
+        torch.set_num_threads(threads)
+    model = whisper.load_model(name, device=device or None)
+    if int8 and model.device.type == "cpu":
+        # whisper's Linear subclass only adds fp16 casting; quantize_dynamic
+        # replaces exact nn.Linear modules, so hand it those
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def _init_worker(model_names, device: str, threads: int, fp16: bool, int8: bool):
+    global _fp16
+    for name in model_names:
+        started = time.perf_counter()
+        _models[name] = load_whisper_model(name, device, threads, int8)
+        logger.info(f"Whisper {name} loaded in pool worker in {time.perf_counter() - started:.1f}s")
+    # half precision only helps (and only works) on GPU
+    _fp16 = fp16 and _models[model_names[0]].device.type != "cpu"
+
+
+def _ping():
+    return list(_models)
+
+
+def _audio_seconds(audio):
+    if isinstance(audio, np.ndarray):
+        return len(audio) / SAMPLE_RATE
+    if isinstance(audio, list):
+        return sum(len(clip) for clip in audio) / SAMPLE_RATE
+    return None
+
+
+def _transcribe(audio, options: dict, model_name: str):
+    started = time.perf_counter()
+    result = _models[model_name].transcribe(audio, **{"fp16": _fp16, **options})
+    return {
+        "text": result["text"].strip(),
+        "segments": [
+            {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+            for segment in result.get("segments", [])
+        ],
+        "language": result.get("language"),
+        "model": model_name,
+        "audio_seconds": _audio_seconds(audio),
+        "inference_seconds": time.perf_counter() - started,
+    }
+
+
+def _transcribe_batch(clips, model_name: str, batch_size: int = BATCH_SIZE):
+    """
+    Transcribe many short clips with as few model calls as possible.
+
+    Clips of up to 30 s are padded to Whisper's 30 s window and decoded
+    ``batch_size`` at a time with one ``whisper.decode`` call (one encoder
+    pass and batched beam search for the whole batch); longer clips go
+    through ``transcribe`` one by one. Each clip's ``inference_seconds`` is
+    its share of its batch's time.
+    """
+    import torch
+    import whisper
+
+    model = _models[model_name]
+    started = time.perf_counter()
+    results = [None] * len(clips)
+    short = [i for i, clip in enumerate(clips) if len(clip) <= whisper.audio.N_SAMPLES]
+    options = whisper.DecodingOptions(fp16=_fp16)
+
+    for start in range(0, len(short), batch_size):
+        indices = short[start:start + batch_size]
+        batch_started = time.perf_counter()
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(clips[i])), model.dims.n_mels
+            )
+            for i in indices
+        ]).to(model.device)
+        decoded = whisper.decode(model, mel, options)
+        share = (time.perf_counter() - batch_started) / len(indices)
+        for i, result in zip(indices, decoded):
+            results[i] = {
+                "text": result.text.strip(),
+                "language": result.language,
+                "no_speech_prob": result.no_speech_prob,
+                "model": model_name,
+                "inference_seconds": share,
+                "batched": True,
+            }
+
+    for i, clip in enumerate(clips):
+        if results[i] is None:
+            result = _transcribe(clip, {}, model_name)
+            results[i] = {
+                "text": result["text"],
+                "language": result["language"],
+                "model": model_name,
+                "inference_seconds": result["inference_seconds"],
+                "batched": False,
+            }
+
+    return {
+        "clips": results,
+        "model": model_name,
+        "audio_seconds": _audio_seconds(clips),
+        "inference_seconds": time.perf_counter() - started,
+    }
+
+
+def _percentile(values, fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+def _audio_digest(audio) -> str:
+    if isinstance(audio, np.ndarray):
+        return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).data).hexdigest()
+    digest = hashlib.sha256()
+    with open(audio, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptionService:
+    def __init__(
+        self, model_name: str = DEFAULT_MODEL, workers: int = 1, queue_size: int = 4, timeout: float = 120,
+        cache=None, fallback_model: str = None, latency_budget: float = 0, device: str = None,
+        threads: int = 0, fp16: bool = True, int8: bool = False,
+    ):
+        self.model_name = model_name
+        self.fallback_model = fallback_model if fallback_model != model_name else None
+        self.latency_budget = latency_budget    # seconds, 0 disables the fallback
+        self.device = device
+        self.threads = threads
+        self.fp16 = fp16
+        self.int8 = int8
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.timeout = timeout
+        self.cache = cache          # DiskCache of finished results, optional
+        self.pool = None
+        self._lock = threading.Lock()
+        self._in_flight = {}        # cache key -> asyncio task of the running inference
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.inference_seconds = 0.0
+        self.inference_times = deque(maxlen=LATENCY_WINDOW)
+        self.wait_times = deque(maxlen=LATENCY_WINDOW)
+        self.real_time_factors = {name: deque(maxlen=LATENCY_WINDOW) for name in self.model_names}
+        self.fallbacks = 0
+
+    @property
+    def model_names(self):
+        return [self.model_name] + ([self.fallback_model] if self.fallback_model else [])
+
+    def start(self):
+        """Spawn the pool and wait until every worker has loaded the model."""
+        if self.pool is not None:
+            return
+        self.pool = self._create_pool()
+        started = time.perf_counter()
+        futures = [self.pool.submit(_ping) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+        logger.info(
+            f"Transcription pool ready: {self.workers} x {'+'.join(self.model_names)} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def _create_pool(self):
+        # spawn, not fork: the parent has threads (embedding worker) and maybe torch state
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_names, self.device, self.threads, self.fp16, self.int8),
+        )
+
+    def _replace_broken_pool(self, broken):
+        """
+        Swap a fresh pool in for ``broken``; only the first caller per broken
+        pool does. The new workers load the model as they start, jobs queue
+        behind that.
+        """
+        with self._lock:
+            if self.pool is not broken:
+                return
+            self.pool = self._create_pool()
+            self.restarts += 1
+        logger.error("A transcription pool worker died, restarted the pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def _admit(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise TranscriptionQueueFull(
+                    f"Transcription queue is full ({self.pending} jobs), try again shortly"
+                )
+            self.pending += 1
+
+    def _finished(self, future):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+                return
+            result = future.result()
+            self.completed += 1
+            self.inference_seconds += result["inference_seconds"]
+            self.inference_times.append(result["inference_seconds"])
+            if result.get("audio_seconds"):
+                self.real_time_factors[result["model"]].append(result["inference_seconds"] / result["audio_seconds"])
+
+    def choose_model(self, audio_seconds: float = None) -> str:
+        """
+        The configured model, or the fallback when this job would likely miss the latency budget.
+
+        Expected latency = jobs already in flight spread over the workers at
+        the recent average inference time, plus this job's audio length
+        times the primary model's median real-time factor.
+        """
+        if not self.fallback_model or not self.latency_budget:
+            return self.model_name
+        with self._lock:
+            factors = list(self.real_time_factors[self.model_name])
+            inference_times = list(self.inference_times)
+            ahead = max(0, self.pending - 1)    # this job is already admitted
+        if not factors:
+            return self.model_name
+
+        own = float(np.median(factors)) * audio_seconds if audio_seconds else float(np.mean(inference_times))
+        expected = ahead / self.workers * float(np.mean(inference_times)) + own
+        if expected <= self.latency_budget:
+            return self.model_name
+        with self._lock:
+            self.fallbacks += 1
+        logger.info(f"Expected latency {expected:.1f}s over budget, using {self.fallback_model}")
+        return self.fallback_model
+
+    def cache_key(self, digest: str, options: dict) -> str:
+        model = f"{self.model_name}-int8" if self.int8 else self.model_name
+        return f"{model}:{json.dumps(options, sort_keys=True, default=str)}:{digest}"
+
+    async def transcribe(self, audio, timeout: float = None, cached: bool = False, **options) -> dict:
+        """
+        Transcribe a 16 kHz float32 array (see ``app.audio``) or a file path in the pool.
+
+        Raises ``TranscriptionQueueFull`` when too many jobs are in flight and
+        ``TranscriptionTimeout`` when the result is not back in time.
+        """
+        if not cached or self.cache is None:
+            return await self._run(_transcribe, audio, (options,), timeout)
+
+        # hashing a long recording takes a few ms, keep it off the event loop
+        key = self.cache_key(await asyncio.to_thread(_audio_digest, audio), options)
+        raw = await asyncio.to_thread(self.cache.get, key)
+        if raw is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return {**json.loads(raw), "cached": True}
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return {**await asyncio.shield(task), "cached": True}
+
+        with self._lock:
+            self.cache_misses += 1
+        task = asyncio.ensure_future(self._run_and_store(key, audio, timeout, options))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shielded: a caller that goes away does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _run_and_store(self, key: str, audio, timeout: float, options: dict) -> dict:
+        result = await self._run(_transcribe, audio, (options,), timeout)
+        # fallback results are not cached, the next submission gets the full model
+        if result["model"] == self.model_name:
+            await asyncio.to_thread(self.cache.set, key, json.dumps(result).encode("utf-8"))
+        return result
+
+    async def transcribe_batch(self, clips, timeout: float = None, cached: bool = False) -> list:
+        """
+        Transcribe several 16 kHz arrays as one pool job (see ``_transcribe_batch``).
+
+        Returns one result per clip, in order. With ``cached=True`` clips seen
+        before are answered from the cache and only the rest are decoded.
+        """
+        results = [None] * len(clips)
+        keys = [None] * len(clips)
+        if cached and self.cache is not None:
+            for i, clip in enumerate(clips):
+                keys[i] = self.cache_key(await asyncio.to_thread(_audio_digest, clip), BATCH_OPTIONS)
+                raw = await asyncio.to_thread(self.cache.get, keys[i])
+                if raw is not None:
+                    results[i] = {**json.loads(raw), "cached": True}
+            with self._lock:
+                hits = sum(result is not None for result in results)
+                self.cache_hits += hits
+                self.cache_misses += len(clips) - hits
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            batch = await self._run(
+                _transcribe_batch, [clips[i] for i in missing], (), timeout or self.timeout * len(missing)
+            )
+            for i, result in zip(missing, batch["clips"]):
+                results[i] = result
+                if keys[i] is not None and result["model"] == self.model_name:
+                    await asyncio.to_thread(self.cache.set, keys[i], json.dumps(result).encode("utf-8"))
+        return results
+
+    async def _run(self, fn, audio, args: tuple, timeout: float) -> dict:
+        self._admit()
+        submitted = time.perf_counter()
+        try:
+            model_name = self.choose_model(_audio_seconds(audio))
+            pool = self.pool
+            try:
+                future = pool.submit(fn, audio, *args, model_name)
+            except BrokenProcessPool:
+                self._replace_broken_pool(pool)
+                pool = self.pool
+                future = pool.submit(fn, audio, *args, model_name)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._finished)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # only helps while still queued
+            with self._lock:
+                self.timeouts += 1
+            raise TranscriptionTimeout(f"Transcription took longer than {timeout or self.timeout}s")
+        except BrokenProcessPool:
+            # a worker died with this job in flight; it fails, later jobs get a new pool
+            self._replace_broken_pool(pool)
+            raise
+
+        with self._lock:
+            self.wait_times.append(time.perf_counter() - submitted - result["inference_seconds"])
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            inference_times = list(self.inference_times)
+            wait_times = list(self.wait_times)
+            return {
+                "model": self.model_name,
+                "fallback_model": self.fallback_model,
+                "latency_budget": self.latency_budget or None,
+                "fallbacks": self.fallbacks,
+                "real_time_factor_p50": {
+                    name: _percentile(list(factors), 0.5) for name, factors in self.real_time_factors.items()
+                },
+                "workers": self.workers,
+                "queue_depth": max(0, self.pending - self.workers),
+                "in_flight": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "inference_seconds_avg": round(self.inference_seconds / self.completed, 3) if self.completed else None,
+                "inference_seconds_p50": _percentile(inference_times, 0.5),
+                "inference_seconds_p95": _percentile(inference_times, 0.95),
+                "queue_wait_seconds_p95": _percentile(wait_times, 0.95),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache": self.cache.stats() if self.cache is not None else None,
+            }
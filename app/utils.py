@@ -1,4 +1,6 @@
 
+import base64
+import json
 import random
 from app.database import SessionLocal
 
@@ -21,3 +23,20 @@ def generate_unique_job_id():
         job_id = random.randint(100000, 999999)
         if not session.query(Job).filter_by(job_id=job_id).first():
             return job_id
+
+
+# Opaque pagination cursors
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Raises ValueError if the cursor is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
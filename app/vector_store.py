@@ -0,0 +1,497 @@
+"""
+Vector store used for candidate search.
+
+All backends share Pinecone's calling convention so the routers do not care
+which one is configured (``settings.vector_backend``):
+
+- ``pinecone``: the hosted ``candidate-search`` index.
+- ``numpy``: exact brute-force cosine search over a memory-mapped float32
+  matrix, fine for small candidate sets and for tests.
+- ``ivf``: the numpy store plus an inverted-file index (k-means coarse
+  quantizer); only the ``nprobe`` closest clusters are scanned. Below
+  ``IVF_MIN_SIZE`` vectors it searches exhaustively.
+
+``upsert`` takes ``(id, vector, metadata)`` tuples and ``query`` returns
+``{"matches": [{"id", "score", "metadata"}, ...]}`` best first; passing
+``ids`` restricts the search to those ids (e.g. a skill filter).
+``metadata_filter`` may describe the same set as a Pinecone filter; the
+local stores ignore it, Pinecone uses it for sets too large to fetch.
+The local stores persist to ``<path>.vectors.f32`` plus an append-only log of
+ids and metadata. They can be shared by several processes (see
+``LocalVectorStore``). The shared store is created lazily through
+``app.services.get_vector_store``.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "candidate-search"
+
+IVF_MIN_SIZE = 10000       # exhaustive search below this many vectors
+IVF_NPROBE = 16            # clusters scanned per query
+IVF_KMEANS_ITERATIONS = 10
+IVF_TRAINING_SAMPLE = 50000
+
+# The local stores' log is compacted once it has this many lines and more
+# than LOG_COMPACT_RATIO lines per live id
+LOG_COMPACT_MIN_LINES = 10000
+LOG_COMPACT_RATIO = 2
+
+# Filtered Pinecone queries over at most PINECONE_FETCH_MAX_IDS ids fetch
+# their vectors this many at a time (ids go in the fetch URL) and score them
+# locally; larger sets are searched by the index with the metadata filter
+PINECONE_FETCH_BATCH = 100
+PINECONE_FETCH_MAX_IDS = 200
+
+
+class VectorStore(ABC):
+    @abstractmethod
+    def upsert(self, items):
+        ...
+
+    @abstractmethod
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, ids=None, metadata_filter=None):
+        ...
+
+    @abstractmethod
+    def delete(self, ids):
+        ...
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, api_key: str, index_name: str, dimension: int):
+        from pinecone import Pinecone
+
+        pc = Pinecone(api_key=api_key)
+        # Check if the index exists; if not, create it
+        if index_name not in [index_info.name for index_info in pc.list_indexes()]:
+            pc.create_index(name=index_name, dimension=dimension, metric="cosine")
+        self.index = pc.Index(name=index_name)
+        logger.info(f"Successfully connected to Pinecone index: {index_name}")
+
+    def upsert(self, items):
+        self.index.upsert(list(items))
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, ids=None, metadata_filter=None):
+        if ids is not None and (metadata_filter is None or len(ids) <= PINECONE_FETCH_MAX_IDS):
+            return self._score_ids(vector, ids, top_k, include_metadata)
+
+        results = self.index.query(
+            vector=vector, top_k=top_k, include_metadata=include_metadata, filter=metadata_filter
+        )
+        return {
+            "matches": [
+                {"id": match["id"], "score": match["score"], "metadata": match.get("metadata") or {}}
+                for match in results["matches"]
+            ]
+        }
+
+    def _score_ids(self, vector, ids, top_k: int, include_metadata: bool):
+        """
+        Exact top_k over a small filtered id set: fetch every vector of the
+        set in batches and rank by cosine locally, keeping only the running
+        best. Used when the set has no metadata filter or is small enough
+        that a few fetches beat a filtered query.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        vector_norm = np.linalg.norm(vector) or 1
+        ids = sorted(set(ids))
+        best = []   # (score, id, metadata), best first, at most top_k
+
+        for start in range(0, len(ids), PINECONE_FETCH_BATCH):
+            fetched = self.index.fetch(ids=ids[start:start + PINECONE_FETCH_BATCH]).vectors
+            if not fetched:
+                continue
+            item_ids = list(fetched)
+            matrix = np.array([fetched[item_id].values for item_id in item_ids], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * vector_norm
+            scores = (matrix @ vector) / np.where(norms == 0, 1, norms)
+            batch = [
+                (float(scores[i]), item_ids[i], (fetched[item_ids[i]].metadata or {}) if include_metadata else {})
+                for i in np.argsort(-scores, kind="stable")[:top_k]
+            ]
+            best = sorted(best + batch, key=lambda match: -match[0])[:top_k]
+
+        return {"matches": [{"id": item_id, "score": score, "metadata": metadata} for score, item_id, metadata in best]}
+
+    def delete(self, ids):
+        self.index.delete(ids=list(ids))
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Exact cosine search over a memory-mapped, L2-normalised float32 matrix.
+
+    Every uvicorn worker and the bulk import CLI may open the same store.
+    Rows live in ``<path>.vectors.f32``; ids and metadata live in an
+    append-only log, ``<path>.log.jsonl``, with one line per upsert or
+    delete. A writer takes an exclusive ``flock`` on ``<path>.lock``,
+    replays whatever other processes appended, writes its vectors, then
+    appends its lines, so row numbers are never handed out twice. Readers
+    replay new log lines before each query. Once the log holds far more
+    lines than live ids it is rewritten; other processes notice the new file
+    and reload.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self.ids = []           # row -> id, None for deleted rows
+        self.metadata = []      # row -> metadata dict
+        self.rows = {}          # id -> row
+        self.live = np.zeros(0, dtype=bool)   # row -> not deleted
+        self.count = 0
+        self.matrix = None      # memmap, capacity rows
+        self._log_inode = None  # log file we have replayed, changes on compaction
+        self._log_offset = 0    # bytes of it replayed
+        self._log_lines = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock, self._write_lock():
+            self._import_legacy_meta()
+            self._open_matrix(1024)
+            self._catch_up()
+
+    @property
+    def vectors_path(self):
+        return f"{self.path}.vectors.f32"
+
+    @property
+    def log_path(self):
+        return f"{self.path}.log.jsonl"
+
+    @property
+    def lock_path(self):
+        return f"{self.path}.lock"
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across processes; taken for every change to the files."""
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _import_legacy_meta(self):
+        # stores written before the log kept everything in one JSON file
+        meta_path = f"{self.path}.meta.json"
+        if os.path.exists(self.log_path) or not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            state = json.load(f)
+        self._rewrite_log(
+            {"id": item_id, "row": row, "metadata": metadata}
+            for row, (item_id, metadata) in enumerate(zip(state["ids"], state["metadata"]))
+            if item_id is not None
+        )
+        os.remove(meta_path)
+        self._log_inode = None   # still to be replayed by _catch_up
+
+    def _open_matrix(self, capacity: int):
+        """(Re)map the vector file with at least ``capacity`` rows; grows it only under the write lock."""
+        if self.matrix is not None:
+            self.matrix.flush()
+        row_bytes = 4 * self.dimension
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if size < capacity * row_bytes:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            size = capacity * row_bytes
+        capacity = size // row_bytes
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self.live)] = self.live[:capacity]
+        self.live = live
+
+    def _reset(self):
+        self.ids, self.metadata, self.rows = [], [], {}
+        self.live[:] = False
+        self.count = 0
+        self._log_offset = self._log_lines = 0
+
+    def _apply(self, record):
+        """Apply one log record to the in-memory view; returns its row."""
+        item_id, row = record["id"], record["row"]
+        if row >= self.matrix.shape[0]:
+            # another process grew the file
+            self._open_matrix(row + 1)
+        while len(self.ids) <= row:
+            self.ids.append(None)
+            self.metadata.append({})
+        if record.get("deleted"):
+            if self.rows.get(item_id) == row:
+                del self.rows[item_id]
+            self.ids[row] = None
+            self.metadata[row] = {}
+            self.live[row] = False
+        else:
+            self.ids[row] = item_id
+            self.metadata[row] = record.get("metadata") or {}
+            self.rows[item_id] = row
+            self.live[row] = True
+        self.count = max(self.count, row + 1)
+        return row
+
+    def _catch_up(self):
+        """Replay log lines appended since we last looked, by any process."""
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            reloaded = stat.st_ino != self._log_inode or stat.st_size < self._log_offset
+            if reloaded:
+                # first load, or the log was compacted: rebuild from scratch
+                self._reset()
+                self._log_inode = stat.st_ino
+            elif stat.st_size == self._log_offset:
+                return
+            f.seek(self._log_offset)
+            data = f.read()
+
+        end = data.rfind(b"\n") + 1   # a writer may be half way through a line
+        rows = [self._apply(json.loads(line)) for line in data[:end].splitlines()]
+        self._log_offset += end
+        self._log_lines += len(rows)
+        if reloaded:
+            self._on_reload()
+        elif rows:
+            self._on_rows_changed(rows)
+
+    def _append(self, records):
+        """Append records to the log; caller holds the write lock and has caught up."""
+        data = "".join(json.dumps(record) + "\n" for record in records).encode()
+        with open(self.log_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            self._log_inode = os.fstat(f.fileno()).st_ino
+        self._log_offset += len(data)
+        self._log_lines += len(records)
+        if self._log_lines > LOG_COMPACT_MIN_LINES and self._log_lines > LOG_COMPACT_RATIO * len(self.rows):
+            self._rewrite_log(
+                {"id": item_id, "row": row, "metadata": self.metadata[row]}
+                for item_id, row in sorted(self.rows.items(), key=lambda item: item[1])
+            )
+
+    def _rewrite_log(self, records):
+        """Replace the log with ``records``; caller holds the write lock."""
+        tmp_path = f"{self.log_path}.tmp"
+        lines = 0
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+                lines += 1
+        os.replace(tmp_path, self.log_path)
+        stat = os.stat(self.log_path)
+        self._log_inode, self._log_offset, self._log_lines = stat.st_ino, stat.st_size, lines
+
+    def upsert(self, items):
+        with self._lock, self._write_lock():
+            self._catch_up()
+            records, touched = [], []
+            for item_id, vector, metadata in items:
+                vector = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm:
+                    vector = vector / norm
+
+                row = self.rows.get(item_id)
+                if row is None:
+                    row = self.count
+                    if row == self.matrix.shape[0]:
+                        self._open_matrix(self.matrix.shape[0] * 2)
+                self.matrix[row] = vector
+                record = {"id": item_id, "row": row, "metadata": metadata or {}}
+                self._apply(record)
+                records.append(record)
+                touched.append(row)
+            if not records:
+                return
+            # vectors first: a reader that sees the log line must find the vector
+            self.matrix.flush()
+            self._append(records)
+            self._on_rows_changed(touched)
+
+    def delete(self, ids):
+        with self._lock, self._write_lock():
+            self._catch_up()
+            records = []
+            for item_id in ids:
+                row = self.rows.get(item_id)
+                if row is None:
+                    continue
+                self.matrix[row] = 0
+                record = {"id": item_id, "row": row, "deleted": True}
+                self._apply(record)
+                records.append(record)
+            if records:
+                self.matrix.flush()
+                self._append(records)
+
+    def _on_rows_changed(self, rows):
+        pass
+
+    def _on_reload(self):
+        pass
+
+    def _candidate_rows(self, vector):
+        """Rows to score exactly; None means all of them."""
+        return None
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, ids=None, metadata_filter=None):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+
+        with self._lock:
+            self._catch_up()
+            if ids is not None:
+                # a filtered set is scored exactly, no need for the IVF lists
+                rows = np.array(sorted(self.rows[i] for i in ids if i in self.rows), dtype=np.int64)
+            else:
+                rows = self._candidate_rows(vector)
+            if rows is None:
+                scores = self.matrix[:self.count] @ vector
+                rows = np.arange(self.count)
+            else:
+                scores = self.matrix[rows] @ vector
+
+            live = self.live[rows]
+            rows, scores = rows[live], scores[live]
+
+            k = min(top_k, len(scores))
+            if k == 0:
+                return {"matches": []}
+            best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            best = best[np.argsort(-scores[best], kind="stable")]
+
+            return {
+                "matches": [
+                    {
+                        "id": self.ids[rows[i]],
+                        "score": float(scores[i]),
+                        "metadata": self.metadata[rows[i]] if include_metadata else {},
+                    }
+                    for i in best
+                ]
+            }
+
+
+class IVFVectorStore(LocalVectorStore):
+    """
+    Local store with an inverted-file index for large candidate sets.
+
+    Vectors are clustered with spherical k-means into ~sqrt(n) lists. A
+    query scores the centroids, then only the rows of the ``nprobe`` best
+    lists. New rows join their nearest list; the quantizer is retrained
+    when the store has doubled since the last training.
+    """
+
+    def __init__(self, path: str, dimension: int, nprobe: int = IVF_NPROBE):
+        self.nprobe = nprobe
+        self.centroids = None
+        self.assignments = None     # row -> list number
+        self.lists = []
+        self.trained_size = 0
+        super().__init__(path, dimension)
+
+    @property
+    def centroids_path(self):
+        return f"{self.path}.ivf.npy"
+
+    def _on_reload(self):
+        if not self.count:
+            return
+        if self.centroids is None and os.path.exists(self.centroids_path):
+            self.centroids = np.load(self.centroids_path)
+        if self.centroids is not None:
+            self._assign_all()
+            self.trained_size = self.trained_size or self.count
+
+    def _assign(self, vectors):
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def _assign_all(self):
+        assignments = np.empty(self.count, dtype=np.int32)
+        for start in range(0, self.count, 65536):
+            assignments[start:start + 65536] = self._assign(self.matrix[start:min(start + 65536, self.count)])
+        self.assignments = assignments
+        self.lists = [np.flatnonzero(assignments == i) for i in range(len(self.centroids))]
+
+    def train(self):
+        """Fit the coarse quantizer with spherical k-means on a sample."""
+        with self._lock:
+            nlist = max(1, int(np.sqrt(self.count)))
+            rng = np.random.default_rng(0)
+            sample_rows = rng.choice(self.count, size=min(self.count, IVF_TRAINING_SAMPLE), replace=False)
+            sample = np.asarray(self.matrix[np.sort(sample_rows)])
+
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+            for _ in range(IVF_KMEANS_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for i in range(nlist):
+                    members = sample[labels == i]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        centroids[i] = centroid / (np.linalg.norm(centroid) or 1)
+
+            self.centroids = centroids.astype(np.float32)
+            # other processes may load it at any time, so never leave it half written
+            tmp_path = f"{self.centroids_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, self.centroids)
+            os.replace(tmp_path, self.centroids_path)
+            self._assign_all()
+            self.trained_size = self.count
+            logger.info(f"IVF index trained: {nlist} lists over {self.count} vectors")
+
+    def _on_rows_changed(self, rows):
+        if self.count < IVF_MIN_SIZE:
+            return
+        if self.centroids is None or self.count >= 2 * self.trained_size:
+            self.train()
+            return
+
+        if self.assignments is None:
+            self._assign_all()
+            return
+        rows = np.asarray(rows)
+        labels = self._assign(self.matrix[rows])
+        grow = np.full(self.count, -1, dtype=np.int32)
+        grow[:len(self.assignments)] = self.assignments
+        old = grow[rows]
+        grow[rows] = labels
+        self.assignments = grow
+        for label in set(old[old >= 0].tolist()) | set(labels.tolist()):
+            self.lists[label] = np.flatnonzero(self.assignments == label)
+
+    def _candidate_rows(self, vector):
+        if self.centroids is None or self.count < IVF_MIN_SIZE:
+            return None
+        probe = np.argsort(-(self.centroids @ vector))[:self.nprobe]
+        return np.concatenate([self.lists[i] for i in probe])
+
+
+def create_vector_store(backend: str = None) -> VectorStore:
+    backend = backend or settings.vector_backend
+    if backend == "pinecone":
+        return PineconeVectorStore(settings.pinecone_api_key, INDEX_NAME, settings.vector_dimension)
+    if backend == "numpy":
+        return LocalVectorStore(settings.vector_store_path, settings.vector_dimension)
+    if backend == "ivf":
+        return IVFVectorStore(settings.vector_store_path, settings.vector_dimension)
+    raise ValueError(f"Unknown vector backend: {backend}")
@@ -0,0 +1,69 @@
+"""
+Worker startup cost: time and peak memory to import the app.
+
+Each run imports ``app.main`` in a fresh interpreter, the way a uvicorn /
+gunicorn worker boots. ``--warm-up`` additionally loads the Whisper pool, the
+embeddings client and the vector store right after the import, which is
+what every worker paid before these became lazy, so
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --warm-up
+
+give the after / before numbers. Needs the usual .env (or environment) for
+the settings; --warm-up also needs network access to Pinecone and Gemini.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+warm_up = None
+if {warm_up}:
+    from app.services import warm_up as load_services
+    started = time.perf_counter()
+    status = load_services()
+    warm_up = time.perf_counter() - started
+peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"import_seconds": imported, "warm_up_seconds": warm_up, "peak_rss_mb": peak_rss_mb}}))
+"""
+
+
+def run_once(module: str, warm_up: bool) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD.format(module=module, warm_up=warm_up)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import time and memory.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="also load every lazy service")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module, args.warm_up) for _ in range(args.runs)]
+    summary = {
+        "module": args.module,
+        "runs": args.runs,
+        "warm_up": args.warm_up,
+        "import_seconds_median": statistics.median(run["import_seconds"] for run in runs),
+        "peak_rss_mb_median": statistics.median(run["peak_rss_mb"] for run in runs),
+    }
+    if args.warm_up:
+        summary["warm_up_seconds_median"] = statistics.median(run["warm_up_seconds"] for run in runs)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
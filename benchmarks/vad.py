@@ -0,0 +1,82 @@
+"""
+Wall time saved by trimming silence before Whisper.
+
+Transcribes each recording twice with the same in-process model, once as
+is and once after ``app.vad.trim_silence``, and reports audio / speech
+length, both inference times and both transcripts so the text can be
+checked too:
+
+    python benchmarks/vad.py answer1.webm answer2.wav --model medium
+
+Recordings are decoded with ffmpeg (``whisper.load_audio``). Each pass is
+repeated ``--runs`` times and the median taken; the first, warm-up pass is
+not counted.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio import SAMPLE_RATE  # noqa: E402
+from app.vad import trim_silence  # noqa: E402
+
+
+def timed_transcribe(model, audio, runs: int):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = model.transcribe(audio, condition_on_previous_text=False)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result["text"].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VAD trimming before Whisper.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--model", default="medium")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    import whisper
+
+    model = whisper.load_model(args.model)
+    model.transcribe(whisper.pad_or_trim(whisper.load_audio(args.paths[0])))  # warm-up
+
+    rows = []
+    for path in args.paths:
+        audio = whisper.load_audio(path)
+        started = time.perf_counter()
+        speech, _ = trim_silence(audio)
+        vad_seconds = time.perf_counter() - started
+
+        full_time, full_text = timed_transcribe(model, audio, args.runs)
+        speech_time, speech_text = timed_transcribe(model, speech, args.runs) if len(speech) else (0.0, "")
+        rows.append({
+            "path": path,
+            "audio_seconds": round(len(audio) / SAMPLE_RATE, 2),
+            "speech_seconds": round(len(speech) / SAMPLE_RATE, 2),
+            "vad_seconds": round(vad_seconds, 4),
+            "full_inference_seconds": round(full_time, 2),
+            "trimmed_inference_seconds": round(speech_time + vad_seconds, 2),
+            "saved_percent": round(100 * (1 - (speech_time + vad_seconds) / full_time), 1) if full_time else None,
+            "full_text": full_text,
+            "trimmed_text": speech_text,
+        })
+
+    full_total = sum(row["full_inference_seconds"] for row in rows)
+    trimmed_total = sum(row["trimmed_inference_seconds"] for row in rows)
+    print(json.dumps({
+        "model": args.model,
+        "recordings": rows,
+        "full_inference_seconds": round(full_total, 2),
+        "trimmed_inference_seconds": round(trimmed_total, 2),
+        "saved_percent": round(100 * (1 - trimmed_total / full_total), 1) if full_total else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
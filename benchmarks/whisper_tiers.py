@@ -0,0 +1,128 @@
+"""
+Latency / accuracy of Whisper model tiers on a fixed local corpus.
+
+The corpus is a directory of recordings, each with a reference transcript
+next to it under the same name (``answer1.wav`` + ``answer1.txt``). For every
+tier the model is loaded with the same options the API uses
+(``app.transcription.load_whisper_model``) and reports:
+
+- load time,
+- real-time factor (inference seconds / audio seconds; below 1 is faster
+  than real time), overall and p95 over the recordings,
+- word error rate against the references (word-level edit distance after
+  lower-casing and stripping punctuation).
+
+    python benchmarks/whisper_tiers.py corpus/ --models tiny base small medium
+    python benchmarks/whisper_tiers.py corpus/ --models base small --device cpu --threads 4 --int8
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.transcription import SAMPLE_RATE, load_whisper_model  # noqa: E402
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".webm", ".ogg", ".m4a", ".flac"}
+
+
+def normalize_words(text: str):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis) -> int:
+    """Levenshtein distance between two word lists (substitutions + insertions + deletions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def load_corpus(directory: str):
+    import whisper
+
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        reference_path = os.path.join(directory, f"{stem}.txt")
+        if extension.lower() not in AUDIO_EXTENSIONS or not os.path.exists(reference_path):
+            continue
+        with open(reference_path, encoding="utf-8") as f:
+            reference = f.read()
+        corpus.append((name, whisper.load_audio(os.path.join(directory, name)), reference))
+    return corpus
+
+
+def benchmark_tier(name: str, corpus, args) -> dict:
+    started = time.perf_counter()
+    model = load_whisper_model(name, args.device, args.threads, args.int8)
+    load_seconds = time.perf_counter() - started
+    fp16 = args.fp16 and model.device.type != "cpu"
+
+    model.transcribe(corpus[0][1][:SAMPLE_RATE * 5], fp16=fp16)  # warm-up, not counted
+
+    audio_total = inference_total = 0.0
+    errors = reference_words = 0
+    factors = []
+    for _, audio, reference in corpus:
+        started = time.perf_counter()
+        result = model.transcribe(audio, fp16=fp16, language=args.language)
+        inference = time.perf_counter() - started
+
+        audio_seconds = len(audio) / SAMPLE_RATE
+        audio_total += audio_seconds
+        inference_total += inference
+        factors.append(inference / audio_seconds)
+
+        reference_tokens = normalize_words(reference)
+        errors += word_errors(reference_tokens, normalize_words(result["text"]))
+        reference_words += len(reference_tokens)
+
+    return {
+        "model": name,
+        "load_seconds": round(load_seconds, 2),
+        "audio_seconds": round(audio_total, 1),
+        "inference_seconds": round(inference_total, 2),
+        "real_time_factor": round(inference_total / audio_total, 3),
+        "real_time_factor_p95": round(float(np.percentile(factors, 95)), 3),
+        "wer": round(errors / reference_words, 4) if reference_words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Whisper tiers: real-time factor and WER.")
+    parser.add_argument("corpus", help="directory of recordings with same-name .txt references")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small", "medium"])
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--fp16", action="store_true", help="half precision (GPU only)")
+    parser.add_argument("--int8", action="store_true", help="dynamic int8 quantization (CPU only)")
+    parser.add_argument("--language", default=None, help="skip language detection, e.g. en")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"no recordings with .txt references found in {args.corpus}")
+
+    results = [benchmark_tier(name, corpus, args) for name in args.models]
+    print(json.dumps({
+        "recordings": len(corpus),
+        "options": {"device": args.device, "threads": args.threads, "fp16": args.fp16, "int8": args.int8},
+        "tiers": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
+import os
 import whisper
 
-# Load Whisper's "tiny" model
-model = whisper.load_model("medium")
+# Model tier comes from the same setting the API uses (WHISPER_MODEL), e.g. "base" on CPU-only machines
+model = whisper.load_model(os.environ.get("WHISPER_MODEL", "medium"))
 
 # Function to transcribe the audio file to text
 def transcribe_audio(audio_file):
@@ -0,0 +1,18 @@
+import os
+
+# app.config needs these at import; the tests never talk to any of them
+for name, value in {
+    "DATABASE_HOSTNAME": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_PASSWORD": "test",
+    "DATABASE_NAME": "test",
+    "DATABASE_USERNAME": "test",
+    "SECRET_KEY": "test",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "API_KEY": "test",
+    "GEMINI_API_KEY": "test",
+    "BASE_URL": "http://localhost",
+    "PINECONE_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
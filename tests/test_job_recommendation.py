@@ -0,0 +1,21 @@
+import numpy as np
+
+from app.job_recommendation import top_k_indices
+
+
+def test_top_k_indices_orders_by_score_then_index():
+    similarities = np.array([0.0, 0.5, 0.0, 0.9, 0.5, 0.0])
+
+    assert list(top_k_indices(similarities, 4)) == [3, 1, 4, 0]
+    assert list(top_k_indices(similarities, 10)) == [3, 1, 4, 0, 2, 5]
+    assert list(top_k_indices(similarities, 0)) == []
+
+
+def test_top_k_indices_pages_do_not_overlap_on_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        # few distinct values, so most of the ranking is ties
+        similarities = rng.integers(0, 3, size=40) / 2
+        ranking = list(np.lexsort((np.arange(40), -similarities)))
+        for k in range(41):
+            assert list(top_k_indices(similarities, k)) == ranking[:k]
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Skill, Language, WorkExperience, Project, Certification
+from app.profiles import load_user_profile, load_user_profiles
+
+# one query for the users plus one per eager-loaded relationship
+PROFILE_QUERIES = 6
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def add_users(db, count):
+    skills = [Skill(skill_name=f"skill {i}") for i in range(3)]
+    languages = [Language(language_name=f"language {i}") for i in range(2)]
+    for i in range(count):
+        db.add(User(
+            email=f"user{i}@example.com",
+            password="x",
+            name=f"User {i}",
+            skills=skills[: i % 3 + 1],
+            languages=languages,
+            experiences=[
+                WorkExperience(company="Acme", position="Engineer", start_date=datetime(2020, 1, 1))
+                for _ in range(2)
+            ],
+            projects=[Project(project_name=f"Project {i}")],
+            certifications=[Certification(certification_name="Cert", certification_provider="Org")],
+        ))
+    db.commit()
+    # start from an empty identity map so nothing is served from memory
+    db.expunge_all()
+    return [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+
+
+def touch_profile(user):
+    return (
+        [skill.skill_name for skill in user.skills],
+        [language.language_name for language in user.languages],
+        [exp.company for exp in user.experiences],
+        [proj.project_name for proj in user.projects],
+        [cert.certification_name for cert in user.certifications],
+    )
+
+
+def test_load_user_profile_query_count(db, count_queries):
+    user_ids = add_users(db, 3)
+    count_queries.clear()
+
+    user = load_user_profile(db, user_ids[1])
+    skills, languages, experiences, projects, certifications = touch_profile(user)
+
+    assert len(count_queries) == PROFILE_QUERIES
+    assert skills == ["skill 0", "skill 1"]
+    assert len(languages) == 2 and len(experiences) == 2
+    assert projects == ["Project 1"] and certifications == ["Cert"]
+
+
+@pytest.mark.parametrize("count", [1, 25])
+def test_load_user_profiles_query_count_is_constant(db, count_queries, count):
+    add_users(db, count)
+    count_queries.clear()
+
+    users = load_user_profiles(db)
+    for user in users:
+        touch_profile(user)
+
+    assert len(users) == count
+    assert len(count_queries) == PROFILE_QUERIES
+
+
+def test_load_user_profiles_pages_by_id(db, count_queries):
+    user_ids = add_users(db, 10)
+    count_queries.clear()
+
+    page = load_user_profiles(db, after_id=user_ids[2], limit=4)
+    for user in page:
+        touch_profile(user)
+
+    assert [user.id for user in page] == user_ids[3:7]
+    assert len(count_queries) == PROFILE_QUERIES